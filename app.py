@@ -3,8 +3,7 @@ from css.streamlit_style_const import STYLE
 from streamlit_option_menu import option_menu
 from views.tabs import places_map_tab, list_view_tab, reviews_analytics_tab, market_analysis_tab
 from template.constants import query_map
-from utils import *
-import pandas as pd
+from data_handling import DataStore, register_stored_datasets
 
 # Page Configuration
 st.set_page_config(page_title="BizReview Analysis", page_icon="📊", layout="wide")
@@ -31,7 +30,9 @@ except Exception as e:
 def initialize_session_state():
     try:
         if 'data_store' not in st.session_state:
-            st.session_state['data_store'] = pd.DataFrame(columns=['City', 'Country', 'Business Point', 'Reviews'])
+            st.session_state['data_store'] = DataStore()
+            # Datasets collected earlier (e.g. by crawler.py) are available without fetching
+            register_stored_datasets(st.session_state['data_store'])
     except Exception as e:
         st.error(f"An error occurred during session state initialization: {str(e)}")
 
@@ -48,11 +49,11 @@ def main():
     # Handling tabs
     try:
         if menu == "Places Map":
-            places_map_tab(query_map, geo_plug, API_KEY)
+            places_map_tab(query_map, API_KEY)
         elif menu == "List View":
             list_view_tab(API_KEY)
         elif menu == "Reviews Analytics":
-            reviews_analytics_tab()
+            reviews_analytics_tab(API_KEY)
         elif menu == "Market Analysis":
             market_analysis_tab()
     except Exception as e:
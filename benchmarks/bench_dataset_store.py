@@ -0,0 +1,98 @@
+"""
+Benchmark of the dataset store: on-disk size, load time and in-memory size of the listings and
+reviews of one large market, stored as pickled frames (the previous format) and as compact
+Parquet read memory-mapped, in full and with the Market Analysis column projection.
+
+    python benchmarks/bench_dataset_store.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_store import DatasetStore  # noqa: E402
+from map_layers import PLACE_FIELDS  # noqa: E402
+from utils import pre_process_listings_data, pre_process_reviews  # noqa: E402
+
+PLACES = 20_000
+REVIEWS_PER_PLACE = 5
+RUNS = 5
+
+
+def synthetic_dataset(n):
+    rng = np.random.default_rng(0)
+    places = pre_process_listings_data(pd.DataFrame({
+        'address': [f"{i} Main St, Lahore" for i in range(n)], 'averageRating': rng.uniform(1, 5, n).round(1),
+        'city': "Lahore,+Pakistan", 'contact': "+92 300 1234567", 'createdAt': "2024-01-01 12:00:00",
+        'id': [str(i + 1) for i in range(n)], 'latitude': 31.5 + rng.random(n) / 10,
+        'longitude': 74.3 + rng.random(n) / 10, 'name': [f"Place {i}" for i in range(n)],
+        'totalReviews': rng.integers(0, 500, n), 'place_id': [f"ChIJ{i:012d}" for i in range(n)],
+        'photo_url': [f"https://example.com/photo/{i}" for i in range(n)],
+    }))
+    m = n * REVIEWS_PER_PLACE
+    reviews = pre_process_reviews(pd.DataFrame({
+        'place_id': [str(i // REVIEWS_PER_PLACE + 1) for i in range(m)],
+        'datetime': pd.to_datetime(rng.integers(1.5e9, 1.7e9, m), unit="s").strftime('%Y-%m-%d %H:%M:%S'),
+        'id': [str(i % REVIEWS_PER_PLACE + 1) for i in range(m)],
+        'place_Name': [f"Place {i // REVIEWS_PER_PLACE}" for i in range(m)],
+        'rating': rng.integers(1, 6, m), 'reviewer': [f"Reviewer {i}" for i in rng.integers(0, m, m)],
+        'serial_Number': [str(i % REVIEWS_PER_PLACE + 1) for i in range(m)],
+        'text': "Great coffee and friendly staff, would come again.", 'photo_url': None,
+        'language': rng.choice(["en", "ur", "ar"], m),
+    }))
+    return places, reviews
+
+
+def best_of(fn):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, _, names in os.walk(path) for name in names)
+
+
+def report(label, seconds, df, disk_bytes=None):
+    disk = f"disk={disk_bytes / 1024 ** 2:6.1f} MB  " if disk_bytes is not None else " " * 18
+    print(f"{label:<28} {disk}load={seconds * 1000:7.1f} ms  "
+          f"memory={df.memory_usage(deep=True).sum() / 1024 ** 2:6.1f} MB")
+
+
+def main():
+    places, reviews = synthetic_dataset(PLACES)
+    root = tempfile.mkdtemp()
+    print(f"{len(places)} places, {len(reviews)} reviews")
+
+    pickle_dir = os.path.join(root, "pickle")
+    os.makedirs(pickle_dir)
+    places.to_pickle(os.path.join(pickle_dir, "places.pkl"))
+    reviews.to_pickle(os.path.join(pickle_dir, "reviews.pkl"))
+    seconds, df = best_of(lambda: pd.read_pickle(os.path.join(pickle_dir, "places.pkl")))
+    report("pickle places", seconds, df, os.path.getsize(os.path.join(pickle_dir, "places.pkl")))
+    seconds, df = best_of(lambda: pd.read_pickle(os.path.join(pickle_dir, "reviews.pkl")))
+    report("pickle reviews", seconds, df, os.path.getsize(os.path.join(pickle_dir, "reviews.pkl")))
+
+    store = DatasetStore(os.path.join(root, "parquet"))
+    store.save("Cafés", "Pakistan", "Lahore", places, reviews)
+    partition = store.partition_path("Cafés", "Pakistan", "Lahore")
+    seconds, df = best_of(lambda: store.load_places("Cafés", "Pakistan", "Lahore"))
+    report("parquet places", seconds, df, os.path.getsize(os.path.join(partition, "places.parquet")))
+    seconds, df = best_of(lambda: store.load_reviews("Cafés", "Pakistan", "Lahore"))
+    report("parquet reviews", seconds, df, os.path.getsize(os.path.join(partition, "reviews.parquet")))
+    seconds, df = best_of(lambda: store.load_places("Cafés", "Pakistan", "Lahore", columns=PLACE_FIELDS))
+    report("parquet places (market)", seconds, df)
+    print(f"total on disk: pickle {directory_size(pickle_dir) / 1024 ** 2:.1f} MB, "
+          f"parquet {directory_size(store.root) / 1024 ** 2:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the Reviews Analytics figure payloads for a place with 5k reviews.
+
+For every chart: bytes sent to the browser and time to produce them, for the previous path
+(go.Figure built on every rerun and serialized by st.plotly_chart) and the figure cache (compact
+typed array payload built once, then fingerprint + cached payload), plus the time the browser side
+takes to parse the payload and decode its typed arrays, measured with node when it is installed.
+
+    python benchmarks/bench_figures.py
+"""
+import json
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_cache import frame_fingerprint  # noqa: E402
+from figure_payload import compact_figure  # noqa: E402
+from plots import (SENTIMENT_COLUMNS, average_rating_overtime, average_rating_wrt_month_year,  # noqa: E402
+                   rating_breakdown_pie, sentiment_score_overtime)
+from review_cube import ReviewCube  # noqa: E402
+
+REVIEWS = 5000
+RUNS = 5
+
+# Parses a payload and decodes its typed arrays, as plotly.js does before drawing
+NODE_DECODE = """
+const fs = require('fs');
+const DTYPES = {i1: Int8Array, u1: Uint8Array, i2: Int16Array, u2: Uint16Array, i4: Int32Array,
+                u4: Uint32Array, f4: Float32Array, f8: Float64Array};
+const decode = (v) => {
+  if (v && typeof v === 'object' && typeof v.bdata === 'string') {
+    // Copied to an aligned buffer of its own
+    const bytes = new Uint8Array(Buffer.from(v.bdata, 'base64'));
+    return new DTYPES[v.dtype](bytes.buffer);
+  }
+  if (v && typeof v === 'object') for (const k in v) v[k] = decode(v[k]);
+  return v;
+};
+const text = fs.readFileSync(process.argv[process.argv.length - 1], 'utf8');
+let best = Infinity;
+for (let i = 0; i < 20; i++) {
+  const start = process.hrtime.bigint();
+  decode(JSON.parse(text));
+  best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+}
+console.log(best.toFixed(2));
+"""
+
+
+def synthetic_reviews(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'place_id': "1", 'datetime': pd.to_datetime(rng.integers(1.5e9, 1.7e9, n), unit="s"),
+        'rating': rng.integers(1, 6, n).astype("float32"), 'reviewer': [f"Reviewer {i}" for i in range(n)],
+        'language': "ur", 'text': [f"Review {i}" for i in range(n)],
+    })
+
+
+def best_of(fn):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def client_ms(payload: str):
+    node = shutil.which("node")
+    if node is None:
+        return None
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        f.write(payload)
+    try:
+        return float(subprocess.run([node, "-e", NODE_DECODE, f.name], capture_output=True, text=True,
+                                    check=True).stdout)
+    finally:
+        os.remove(f.name)
+
+
+def main():
+    reviews = synthetic_reviews(REVIEWS)
+    cube = ReviewCube().update(reviews)
+    charts = [
+        ("average_rating_overtime", average_rating_overtime, cube.quarterly(1), None),
+        ("rating_breakdown_pie", rating_breakdown_pie, cube.rating_histogram(1), None),
+        ("sentiment_score_overtime", sentiment_score_overtime, reviews, SENTIMENT_COLUMNS),
+        ("average_rating_wrt_month_year", average_rating_wrt_month_year, cube.monthly(1), None),
+    ]
+    print(f"{REVIEWS} reviews")
+    print(f"{'chart':<30} {'previous':>22} {'compact':>22} {'cache hit':>10} {'client parse':>22}")
+    for label, chart, df, columns in charts:
+        chart(df)  # warms the sentiment score memo
+        legacy_seconds, legacy = best_of(lambda: plotly.io.to_json(chart(df).to_dict(), validate=False))
+        compact_seconds, spec = best_of(lambda: compact_figure(chart(df)))
+        stored = pickle.dumps(spec)
+        hit_seconds, payload = best_of(lambda: (frame_fingerprint(df, columns),
+                                                plotly.io.to_json(pickle.loads(stored), validate=False))[1])
+        legacy_client, compact_client = client_ms(legacy), client_ms(payload)
+        client = (f"{legacy_client:6.2f} -> {compact_client:6.2f} ms" if legacy_client is not None
+                  else "node not installed")
+        print(f"{label:<30} {legacy_seconds * 1000:7.1f} ms {len(legacy) / 1024:7.1f} KB "
+              f"{compact_seconds * 1000:7.1f} ms {len(payload) / 1024:7.1f} KB {hit_seconds * 1000:7.1f} ms "
+              f"{client:>22}")
+        assert json.loads(payload)["data"]
+
+
+if __name__ == "__main__":
+    main()
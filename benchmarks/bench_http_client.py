@@ -0,0 +1,131 @@
+"""
+Benchmark of the Places HTTP layer against a local stub server.
+
+Compares the old pattern (bare ``requests.get`` per call, fresh ThreadPoolExecutor per page)
+with the pooled clients in ``http_client`` for one city, reporting TCP connections opened
+and wall time.
+
+    python benchmarks/bench_http_client.py
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+import requests
+
+PLACES_PER_CITY = 20
+DETAILS_LATENCY = 0.03
+# Simulated cost of a fresh TCP + TLS handshake (two round-trips to the Places API)
+HANDSHAKE_LATENCY = 0.06
+
+
+class StubPlacesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StubPlacesHandler.lock:
+            StubPlacesHandler.connections += 1
+        time.sleep(HANDSHAKE_LATENCY)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith("/textsearch/json"):
+            body = {"status": "OK", "results": [
+                {"place_id": f"p{i}", "name": f"Place {i}", "formatted_address": f"{i} Main St",
+                 "geometry": {"location": {"lat": 31.5 + i / 1000, "lng": 74.3 + i / 1000}}}
+                for i in range(PLACES_PER_CITY)
+            ]}
+        else:
+            time.sleep(DETAILS_LATENCY)
+            body = {"status": "OK", "result": {
+                "name": query["place_id"][0], "rating": 4.2, "user_ratings_total": 120,
+                "international_phone_number": "+92 300 1234567",
+                "reviews": [{"author_name": "A", "rating": 5, "text": "Great", "time": 1700000000,
+                             "language": "en"}],
+            }}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def baseline_city(base_url, api_key="stub"):
+    """The pre-pooling pipeline: bare requests.get for every call, one executor per page."""
+    def details(result):
+        return requests.get(f"{base_url}/details/json?place_id={result['place_id']}&key={api_key}").json()
+
+    def place_details(result, i):
+        return extract_place_info(client, result, details(result), "Lahore", i)
+
+    client = PlacesClient(api_key, base_url)
+    places_list = []
+    search_data = requests.get(f"{base_url}/textsearch/json?query=cafes+in+Lahore&key={api_key}").json()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(place_details, r, i) for i, r in enumerate(search_data["results"])]
+        for future in futures:
+            places_list.append(future.result())
+            place_data = pre_process_listings_data(pd.DataFrame(places_list))
+    # List View then re-requests details for every place, one by one
+    for _, place in place_data.iterrows():
+        extract_place_reviews(place, details(place))
+    return place_data
+
+
+def pooled_city(api_key="stub"):
+    """The current pipeline: one pooled details fetch per place gives both listings and reviews."""
+    place_data = reviews_data = None
+    for place_data, reviews_data in get_places_data(api_key, "cafes", "Lahore", n=PLACES_PER_CITY):
+        pass
+    return place_data, reviews_data
+
+
+def measure(label, fn, *args):
+    StubPlacesHandler.connections = 0
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} connections={StubPlacesHandler.connections:<4} wall={elapsed * 1000:8.1f} ms")
+
+
+def main():
+    server, base_url = start_stub_server()
+    os.environ["PLACES_API_URL"] = base_url
+    # Start from an empty details cache so every run measures cold fetches
+    os.environ["DETAILS_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "place_details.sqlite")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    global PlacesClient, extract_place_info, extract_place_reviews, get_places_data, pre_process_listings_data
+    from http_client import PlacesClient
+    from utils import extract_place_info, extract_place_reviews, get_places_data, pre_process_listings_data
+
+    print(f"one city, {PLACES_PER_CITY} places, {DETAILS_LATENCY * 1000:.0f} ms details latency, "
+          f"{HANDSHAKE_LATENCY * 1000:.0f} ms handshake")
+    measure("before", baseline_city, base_url)
+    measure("after", pooled_city)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Startup benchmark: import-time profile of the modules a Streamlit worker loads on boot.
+
+Runs ``python -X importtime`` on the app's entry imports in a fresh interpreter, reports the
+total and the slowest top-level imports, and checks that the NLP and plotting libraries only
+needed by Reviews Analytics are not loaded at startup.
+
+    python benchmarks/bench_import_time.py
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_IMPORTS = "import views.tabs, data_handling, template.constants"
+DEFERRED_MODULES = ("textblob", "nltk", "wordcloud", "matplotlib")
+TOP_N = 15
+
+
+def import_profile():
+    check = f"{STARTUP_IMPORTS}; import sys; print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", check], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        rows.append((int(cumulative_us), name.rstrip()))
+    return rows, proc.stdout.strip()
+
+
+def main():
+    rows, loaded = import_profile()
+    # The module name column is indented by two spaces per nesting level
+    depth = [((len(name) - len(name.lstrip())) - 1) // 2 for _, name in rows]
+    total = sum(us for (us, _), level in zip(rows, depth) if level == 0)
+    direct = [(us, name.strip()) for (us, name), level in zip(rows, depth) if level == 1]
+
+    print(f"startup imports: {STARTUP_IMPORTS}")
+    print(f"total import time: {total / 1000:.0f} ms")
+    print("slowest imports made by the app modules:")
+    for us, name in sorted(direct, reverse=True)[:TOP_N]:
+        print(f"{us / 1000:>9.1f} ms  {name}")
+    print(f"deferred modules loaded at startup: {loaded or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark of the Places Map rendering: HTML size and render time per marker count.
+
+Compares one folium.Marker with an IFrame popup per place (the previous map_view loop) with the
+PlacesLayer JSON payload whose popups are filled from one template in the browser.
+
+    python benchmarks/bench_map_render.py
+"""
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from map_layers import PlacesLayer, places_bounds  # noqa: E402
+from template.html import POPUP  # noqa: E402
+
+SIZES = (20, 200, 2000)
+
+
+def synthetic_places(n):
+    rng = np.random.default_rng(n)
+    reviews = rng.integers(0, 500, n)
+    return pd.DataFrame({
+        'latitude': 31.5 + rng.random(n) / 10, 'longitude': 74.3 + rng.random(n) / 10,
+        'markerColor': np.where(reviews >= 100, "green", "red"), 'photo_url': "https://example.com/photo.jpg",
+        'name': [f"Place {i}" for i in range(n)], 'address': [f"{i} Main St, Lahore" for i in range(n)],
+        'averageRating': rng.uniform(1, 5, n).round(1), 'totalReviews': reviews, 'contact': "923001234567",
+    })
+
+
+def marker_map(df):
+    places_map = folium.Map(location=[0, 0], zoom_start=10, control_scale=True, prefer_canvas=True)
+    for i, row in df.iterrows():
+        iframe = folium.IFrame(POPUP.format(str(row['photo_url']), str(row["name"]), str(row["address"]),
+                                            str(row["averageRating"]), str(row["totalReviews"]), row["contact"]),
+                               width=300, height=250)
+        popup = folium.Popup(iframe, min_width=150, max_width=300)
+        folium.Marker(location=[row['latitude'], row['longitude']], tooltip=row["name"],
+                      icon=folium.Icon(color=row['markerColor'], icon="fa-coffee", prefix='fa'),
+                      popup=popup).add_to(places_map)
+    places_map.fit_bounds(places_map.get_bounds())
+    return places_map
+
+
+def layer_map(df):
+    places_map = folium.Map(location=[0, 0], zoom_start=10, control_scale=True, prefer_canvas=True)
+    places_layer = PlacesLayer(icon="fa-coffee")
+    places_layer.add_to(places_map)
+    places_layer.append(df)
+    places_map.fit_bounds(places_bounds(df))
+    return places_map
+
+
+def main():
+    print(f"{'markers':>8} {'mode':<8} {'html':>10} {'build+render':>13}")
+    for n in SIZES:
+        df = synthetic_places(n)
+        for label, build in (("markers", marker_map), ("layer", layer_map)):
+            start = time.perf_counter()
+            html = build(df).get_root().render()
+            elapsed = time.perf_counter() - start
+            print(f"{n:>8} {label:<8} {len(html.encode()) / 1024:>7.0f} KB {elapsed * 1000:>10.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of the Market Analysis maps in plots.py: build + HTML render time and size.
+
+Compares the previous per-row loops (one folium marker, and an IFrame popup for the circles map,
+per place) with the bulk layers used by folium_marker_map and spatial_dist_of_business_points.
+
+    python benchmarks/bench_market_maps.py
+"""
+import os
+import sys
+import time
+
+import folium
+import numpy as np
+import pandas as pd
+from folium.plugins import MarkerCluster
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from plots import business_clusters_map, rating_circles_map  # noqa: E402
+from template.html import POPUP  # noqa: E402
+
+SIZES = (100, 1000, 5000)
+
+
+def synthetic_places(n):
+    rng = np.random.default_rng(n)
+    return pd.DataFrame({
+        'latitude': 31.5 + rng.random(n) / 10, 'longitude': 74.3 + rng.random(n) / 10,
+        'name': [f"Place {i}" for i in range(n)], 'address': [f"{i} Main St, Lahore" for i in range(n)],
+        'averageRating': rng.uniform(1, 5, n).round(1), 'totalReviews': rng.integers(0, 500, n),
+        'contact': "923001234567",
+    })
+
+
+def loop_clusters_map(df):
+    m = folium.Map(location=[df['latitude'].mean(), df['longitude'].mean()], zoom_start=12)
+    marker_cluster = MarkerCluster().add_to(m)
+    for i, row in df.iterrows():
+        popup_text = f"<strong>{row['name']}</strong><br>Rating: {row['averageRating']}<br>Reviews: {row['totalReviews']}"
+        folium.Marker(location=[row['latitude'], row['longitude']], popup=popup_text).add_to(marker_cluster)
+    m.fit_bounds(m.get_bounds())
+    return m
+
+
+def loop_circles_map(df):
+    m = folium.Map(location=[df['latitude'].mean(), df['longitude'].mean()], zoom_start=10, control_scale=True,
+                   prefer_canvas=True)
+    for i, row in df.iterrows():
+        iframe = folium.IFrame(POPUP.format("", str(row["name"]), str(row["address"]), str(row["averageRating"]),
+                                            str(row["totalReviews"]), row["contact"]), width=320, height=180)
+        popup = folium.Popup(iframe, min_width=150, max_width=300)
+        folium.CircleMarker(location=[row['latitude'], row['longitude']], radius=row['totalReviews'] / 50,
+                            color=None, fill=True,
+                            fill_color='blue' if row['averageRating'] >= 4 else 'yellow' if row['averageRating'] >= 3
+                            else 'red', fill_opacity=0.6, popup=popup).add_to(m)
+    m.fit_bounds(m.get_bounds())
+    return m
+
+
+def measure(build, df):
+    start = time.perf_counter()
+    html = build(df).get_root().render()
+    return time.perf_counter() - start, len(html.encode())
+
+
+def main():
+    print(f"{'points':>7} {'map':<32} {'before':>20} {'after':>20}")
+    for n in SIZES:
+        df = synthetic_places(n)
+        for label, before, after in (("spatial_dist_of_business_points", loop_clusters_map, business_clusters_map),
+                                     ("folium_marker_map", loop_circles_map, rating_circles_map)):
+            (t0, b0), (t1, b1) = measure(before, df), measure(after, df)
+            print(f"{n:>7} {label:<32} {t0 * 1000:>7.0f} ms {b0 / 1024:>7.0f} KB "
+                  f"{t1 * 1000:>7.0f} ms {b1 / 1024:>7.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
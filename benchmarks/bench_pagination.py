@@ -0,0 +1,126 @@
+"""
+Benchmark of text-search pagination against a local mock Places server.
+
+The mock issues a ``next_page_token`` that only turns valid TOKEN_DELAY seconds later
+(INVALID_REQUEST before that) and answers a share of requests with OVER_QUERY_LIMIT.
+Compares the previous loop (fixed 2 s sleep between pages, no retries) with the
+rate-limited, retrying PlacesClient, reporting results collected and time to the last page.
+
+    python benchmarks/bench_pagination.py
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_client import PlacesClient  # noqa: E402
+from rate_limit import TokenBucket  # noqa: E402
+
+PAGES = 3
+PAGE_SIZE = 20
+TOKEN_DELAY = 1.2
+RUNS = 5
+
+
+class MockPlacesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    quota_error_rate = 0.0
+    tokens = {}
+    lock = threading.Lock()
+    rng = random.Random(0)
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        with MockPlacesHandler.lock:
+            quota_error = MockPlacesHandler.rng.random() < MockPlacesHandler.quota_error_rate
+
+        if quota_error:
+            body = {"status": "OVER_QUERY_LIMIT", "results": []}
+        elif "pagetoken" in query and time.monotonic() < MockPlacesHandler.tokens[query["pagetoken"][0]][1]:
+            body = {"status": "INVALID_REQUEST", "results": []}
+        else:
+            page = MockPlacesHandler.tokens[query["pagetoken"][0]][0] if "pagetoken" in query else 0
+            body = {"status": "OK", "results": [{"place_id": f"p{page * PAGE_SIZE + i}"} for i in range(PAGE_SIZE)]}
+            if page + 1 < PAGES:
+                token = f"token-{random.random()}"
+                MockPlacesHandler.tokens[token] = (page + 1, time.monotonic() + TOKEN_DELAY)
+                body["next_page_token"] = token
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def fixed_sleep_pages(base_url):
+    """The previous loop: stop at the first page without results, sleep 2 s between pages."""
+    results, next_page_token = [], None
+    while True:
+        url = f"{base_url}/textsearch/json?query=cafes+in+Lahore&key=stub"
+        if next_page_token:
+            url += f"&pagetoken={next_page_token}"
+        search_data = requests.get(url).json()
+        if not search_data.get("results"):
+            break
+        results.extend(search_data["results"])
+        next_page_token = search_data.get("next_page_token")
+        if not next_page_token:
+            break
+        time.sleep(2)
+    return results
+
+
+def adaptive_pages(base_url):
+    client = PlacesClient("stub", base_url, rate_limiter=TokenBucket())
+    results, next_page_token = [], None
+    while True:
+        search_data = client.text_search("cafes+in+Lahore", next_page_token)
+        if search_data.get("status") != "OK":
+            break
+        results.extend(search_data["results"])
+        next_page_token = search_data.get("next_page_token")
+        if not next_page_token:
+            break
+    client.close()
+    return results
+
+
+def measure(label, fn, base_url):
+    counts, times = [], []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        counts.append(len(fn(base_url)))
+        times.append(time.perf_counter() - start)
+    print(f"{label:<10} results={sum(counts) / RUNS:5.1f}/{PAGES * PAGE_SIZE} "
+          f"(min {min(counts):2d})  time={sum(times) / RUNS:5.2f} s")
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockPlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    for quota_error_rate in (0.0, 0.2):
+        MockPlacesHandler.quota_error_rate = quota_error_rate
+        print(f"{PAGES} pages, token valid after {TOKEN_DELAY} s, {quota_error_rate:.0%} OVER_QUERY_LIMIT, {RUNS} runs")
+        measure("before", fixed_sleep_pages, base_url)
+        measure("after", adaptive_pages, base_url)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of pre_process_listings_data on synthetic listings.
+
+Compares the previous row-wise implementation (``.apply`` lambdas and a per-row ``filter``
+for phone digits) with the vectorized one in utils, and checks both produce the same values.
+
+    python benchmarks/bench_preprocessing.py
+"""
+import gc
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import MARKER_COLOR_BINS, MARKER_COLORS, adjusted_reviews, pre_process_listings_data  # noqa: E402
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def synthetic_listings(n):
+    rng = np.random.default_rng(n)
+    return pd.DataFrame({
+        'address': "1 Main St", 'averageRating': rng.uniform(1, 5, n).round(1), 'city': "Lahore,+Pakistan",
+        'contact': np.where(rng.random(n) < 0.9, np.char.add("+92 300 ", np.arange(n).astype(str)), ""),
+        'createdAt': "2024-01-01 10:00:00", 'id': np.arange(1, n + 1).astype(str),
+        'latitude': 31.5 + rng.random(n), 'longitude': 74.3 + rng.random(n), 'name': "Place",
+        'totalReviews': rng.integers(0, 500, n), 'place_id': "p", 'photo_url': None,
+    })
+
+
+def row_wise_adjusted_reviews(review):
+    if review >= 200:
+        return "More than 200"
+    elif 100 < review <= 200:
+        return "100-200"
+    elif 50 < review <= 100:
+        return "50 to 100"
+    else:
+        return "Up-to 50"
+
+
+def row_wise_pre_process_listings_data(data):
+    data.reset_index(inplace=True)
+    for column in ['averageRating', 'latitude', 'longitude', 'totalReviews', 'id']:
+        if column == 'averageRating':
+            data[column] = pd.to_numeric(data[column], errors='coerce').fillna(0).astype('float')
+        else:
+            data[column] = pd.to_numeric(data[column], errors='coerce', downcast='float')
+    data['createdAt'] = pd.to_datetime(data['createdAt'])
+    data["contact"] = data["contact"].apply(lambda x: ''.join(filter(str.isdigit, str(x))))
+    data.fillna(0, inplace=True)
+    data["markerColor"] = data["totalReviews"].apply(
+        lambda x: "green" if x >= 100 else ("orange" if x >= 50 else ("lightgray" if x >= 25 else "red")))
+    data["totalReviews"] = data["totalReviews"].astype(int)
+    data["adjustedReview"] = data["totalReviews"].apply(row_wise_adjusted_reviews)
+    data["adjustedRating"] = data["averageRating"].apply(lambda x: int(x // 1))
+    data.sort_values(by='totalReviews', inplace=True)
+    data.reset_index(drop=True, inplace=True)
+    return data
+
+
+def row_wise_buckets(data):
+    data["markerColor"] = data["totalReviews"].apply(
+        lambda x: "green" if x >= 100 else ("orange" if x >= 50 else ("lightgray" if x >= 25 else "red")))
+    data["adjustedReview"] = data["totalReviews"].apply(row_wise_adjusted_reviews)
+    data["adjustedRating"] = data["averageRating"].apply(lambda x: int(x // 1))
+    return data
+
+
+def vectorized_buckets(data):
+    data["markerColor"] = pd.cut(data["totalReviews"], bins=MARKER_COLOR_BINS, labels=MARKER_COLORS, right=False)
+    data["adjustedReview"] = adjusted_reviews(data["totalReviews"])
+    data["adjustedRating"] = (data["averageRating"] // 1).astype(int)
+    return data
+
+
+def row_wise_digits(data):
+    return data["contact"].apply(lambda x: ''.join(filter(str.isdigit, str(x))))
+
+
+def vectorized_digits(data):
+    return data["contact"].astype(str).str.replace(r"\D", "", regex=True)
+
+
+def timed(fn, df):
+    df = df.copy()
+    gc.collect()
+    start = time.perf_counter()
+    result = fn(df)
+    return result, time.perf_counter() - start
+
+
+def report(label, before, after):
+    print(f"{label:<26} {before * 1000:>8.0f} ms {after * 1000:>8.0f} ms {before / after:>7.1f}x")
+
+
+def main():
+    for n in SIZES:
+        df = synthetic_listings(n)
+        print(f"{n} rows{'':<19} {'row-wise':>11} {'vectorized':>11} {'speedup':>8}")
+
+        expected, before = timed(row_wise_pre_process_listings_data, df)
+        result, after = timed(pre_process_listings_data, df)
+        for column in ("markerColor", "adjustedReview", "adjustedRating", "contact"):
+            assert (result[column].astype(object).values == expected[column].astype(object).values).all(), column
+        report("pre_process_listings_data", before, after)
+
+        buckets = df.assign(totalReviews=df["totalReviews"].astype(int))
+        report("  bucket columns", timed(row_wise_buckets, buckets)[1], timed(vectorized_buckets, buckets)[1])
+        report("  contact digits", timed(row_wise_digits, df)[1], timed(vectorized_digits, df)[1])
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark of the Top Rated Places ranking at 100k places.
+
+Compares the previous per-render pipeline of top_performing_places (groupby, quantile threshold,
+scores, full sort and hover text concatenation) with the ranking engine: market_scores computed once
+per dataset, then rank_places (argpartition top-k) per render, for one market and for the same
+places split over 20 cities ranked together.
+
+    python benchmarks/bench_ranking.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ranking import market_scores, rank_places  # noqa: E402
+
+PLACES = 100_000
+CITIES = 20
+RUNS = 5
+
+
+def synthetic_places(n):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'name': [f"Place {i}" for i in rng.integers(0, n * 9 // 10, n)],
+        'averageRating': rng.uniform(1, 5, n).round(1).astype("float32"),
+        'totalReviews': rng.integers(0, 5000, n).astype("int32"),
+        'city': rng.integers(0, CITIES, n),
+    })
+
+
+def legacy_top_places(df):
+    df = df.dropna(subset=["averageRating"])
+    df = df.groupby("name").agg({"averageRating": "mean", "totalReviews": "sum"}).reset_index()
+    thresh = df["totalReviews"].quantile(0.40)
+    df = df[df["totalReviews"] >= thresh]
+    df['Satisfaction Score'] = (df['averageRating'] * df['totalReviews']) / df['totalReviews'].sum()
+    df['Relative Satisfaction Score'] = (df['Satisfaction Score'] / df['Satisfaction Score'].max()) * 100
+    df['Reliability Score'] = df['averageRating'] * np.log1p(df['totalReviews'])
+    df.sort_values(by="Relative Satisfaction Score", ascending=False, inplace=True)
+    top_places = df.head(30)
+    hovertext = ("Rating: " + top_places["averageRating"].astype(str) + " stars<br>" +
+                 "Total Reviews: " + top_places["totalReviews"].astype(str) + "<br>" +
+                 "Satisfaction Score: " + top_places["Satisfaction Score"].round(4).astype(str))
+    return top_places, hovertext
+
+
+def best_of(fn):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    places = synthetic_places(PLACES)
+    print(f"{PLACES} places, {places['name'].nunique()} names")
+
+    legacy_seconds, (legacy, _) = best_of(lambda: legacy_top_places(places[["name", "averageRating", "totalReviews"]]))
+    scores_seconds, scores = best_of(lambda: market_scores(places))
+    rank_seconds, ranked = best_of(lambda: rank_places(scores))
+    assert np.allclose(ranked["satisfaction"], legacy["Satisfaction Score"])
+    print(f"previous, per render:          {legacy_seconds * 1000:7.1f} ms")
+    print(f"market_scores, once:           {scores_seconds * 1000:7.1f} ms")
+    print(f"rank_places, per render:       {rank_seconds * 1000:7.1f} ms")
+
+    cities = [city_places for _, city_places in places.groupby("city")]
+    city_scores = [market_scores(city_places, f"City {i}") for i, city_places in enumerate(cities)]
+    multi_seconds, ranked = best_of(lambda: rank_places(city_scores))
+    print(f"rank_places, {CITIES} cities together: {multi_seconds * 1000:5.1f} ms "
+          f"(best: {ranked['name'][0]} in {ranked['market'][0]})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the near-duplicate review stage (review_quality.flag_duplicates).
+
+Flags a synthetic corpus with copied reviews (one word edited) injected, reporting time,
+precision/recall against the injected copies and the signature index memory, then the time to
+flag a sync-sized batch of new reviews appended to the flagged corpus, with and without the
+index kept from the first pass.
+
+    python benchmarks/bench_review_quality.py [reviews]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from review_quality import MIN_TEXT_LENGTH, SignatureIndex, flag_duplicates  # noqa: E402
+
+REVIEWS = 200_000
+COPIES = 0.02
+APPENDED = 1_000
+
+
+def synthetic_texts(n, rng):
+    vocabulary = np.array([f"word{i}" for i in range(20_000)])
+    texts = [" ".join(rng.choice(vocabulary, rng.integers(8, 80))) for _ in range(n)]
+    copied = np.zeros(n, dtype=bool)
+    for i in np.sort(rng.choice(np.arange(1, n), int(n * COPIES), replace=False)):
+        words = texts[rng.integers(0, i)].split()
+        if len(words) >= 12:
+            words[rng.integers(len(words))] = "edited"
+        texts[i] = " ".join(words).capitalize() + "."
+        copied[i] = len(texts[i]) >= MIN_TEXT_LENGTH
+    return texts, copied
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else REVIEWS
+    rng = np.random.default_rng(0)
+    texts, copied = synthetic_texts(n + APPENDED, rng)
+    reviews = pd.DataFrame({"text": texts[:n]})
+
+    index = SignatureIndex()
+    start = time.perf_counter()
+    flagged = flag_duplicates(reviews, index)
+    seconds = time.perf_counter() - start
+    duplicate = flagged["duplicate"].to_numpy()
+    true_positives = (duplicate & copied[:n]).sum()
+    print(f"{n} reviews flagged in {seconds:.1f} s ({n / seconds:,.0f} reviews/s)")
+    print(f"flagged {duplicate.sum()}, injected copies {copied[:n].sum()}: "
+          f"precision {true_positives / max(duplicate.sum(), 1):.3f}, recall {true_positives / max(copied[:n].sum(), 1):.3f}")
+
+    print(f"signature index: {len(index)} reviews, "
+          f"{(index.signatures.nbytes + index.keys.nbytes) / 1024 ** 2:.1f} MB (capacity {index.capacity})")
+
+    appended = pd.concat([flagged, pd.DataFrame({"text": texts[n:]})], ignore_index=True)
+    for label, appended_index in (("with the kept index", index), ("rebuilding the index", None)):
+        start = time.perf_counter()
+        flag_duplicates(appended, appended_index)
+        print(f"{APPENDED} appended reviews flagged {label}: {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
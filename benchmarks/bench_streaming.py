@@ -0,0 +1,78 @@
+"""
+Benchmark of the get_places_data streaming step on synthetic places.
+
+Compares the old cumulative mode (rebuild and re-process the whole frame after every place,
+re-add markers for every row) with the incremental mode (process and draw only the new rows
+of each batch, append-only accumulator). Places arrive one per batch, the worst case.
+
+    python benchmarks/bench_streaming.py
+"""
+import os
+import random
+import sys
+import time
+
+import folium
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import ListingsAccumulator, pre_process_listings_data, process_places_batch  # noqa: E402
+
+
+def synthetic_places(n):
+    rng = random.Random(n)
+    return [{
+        'address': f"{i} Main St", 'averageRating': round(rng.uniform(1, 5), 1), 'city': "Lahore,+Pakistan",
+        'contact': "+92 300 1234567", 'createdAt': "2024-01-01 10:00:00", 'id': str(i + 1),
+        'latitude': 31.5 + rng.random() / 10, 'longitude': 74.3 + rng.random() / 10, 'name': f"Place {i}",
+        'totalReviews': rng.randint(0, 500), 'place_id': f"p{i}", 'photo_url': None,
+    } for i in range(n)]
+
+
+def add_markers(places_map, df):
+    for _, row in df.iterrows():
+        folium.Marker(location=[row['latitude'], row['longitude']], tooltip=row["name"]).add_to(places_map)
+    return len(df)
+
+
+def cumulative(places):
+    places_map = folium.Map(location=[0, 0])
+    place_data = pd.DataFrame()
+    places_list = []
+    markers = 0
+    for place_info in places:
+        places_list.append(place_info)
+        partial_place_data = pre_process_listings_data(pd.DataFrame(places_list))
+        place_data = pd.concat([place_data, partial_place_data], ignore_index=True)
+        place_data.drop_duplicates(subset=['id'], inplace=True)
+        markers += add_markers(places_map, partial_place_data)
+    return markers
+
+
+def incremental(places):
+    places_map = folium.Map(location=[0, 0])
+    accumulator = ListingsAccumulator()
+    seen_place_ids = set()
+    markers = 0
+    for place_info in places:
+        new_places, new_reviews = process_places_batch([(place_info, pd.DataFrame())], seen_place_ids)
+        accumulator.append(new_places, new_reviews)
+        markers += add_markers(places_map, new_places)
+    accumulator.places_frame()
+    return markers
+
+
+def main():
+    print(f"{'n':>5} {'mode':<12} {'markers':>8} {'time':>10}")
+    for n in (20, 60, 200):
+        places = synthetic_places(n)
+        for label, fn in (("cumulative", cumulative), ("incremental", incremental)):
+            start = time.perf_counter()
+            markers = fn(places)
+            elapsed = time.perf_counter() - start
+            print(f"{n:>5} {label:<12} {markers:>8} {elapsed * 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
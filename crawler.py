@@ -0,0 +1,221 @@
+"""
+Headless crawler filling the local dataset store for many (business place x city) markets.
+
+    python crawler.py --api-key KEY --country Pakistan --cities Lahore Karachi --businesses Cafés Bakeries
+
+Finished jobs are checkpointed, so an interrupted crawl resumes where it stopped when run again.
+With --sync-reviews, only the new reviews of the markets already stored are fetched.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+
+from dataset_store import DatasetStore, get_dataset_store
+from review_quality import flag_duplicates
+from review_sync import sync_reviews
+from utils import ListingsAccumulator, get_places_data
+
+# Markets crawled at the same time; requests of all of them share the API key's rate limiter
+CONCURRENCY = 4
+# Places fetched per market (the text search returns at most 3 pages of 20)
+PLACES_PER_JOB = 60
+CHECKPOINT_PATH = os.path.join(".cache", "crawl_checkpoint.json")
+
+
+@dataclass
+class JobProgress:
+    business_place: str
+    country: str
+    city: str
+    status: str = "pending"
+    places: int = 0
+    reviews: int = 0
+    duplicates: int = 0
+    error: str = ""
+    elapsed: float = 0.0
+
+    @property
+    def job_id(self) -> str:
+        return f"{self.business_place}|{self.country}|{self.city}"
+
+
+class Crawler:
+    """
+    Runs crawl jobs on a bounded thread pool and saves every finished job to the dataset store.
+    A place is kept only in the first city it was found in for a business place, so overlapping
+    cities don't store it twice (its details come from the details cache the second time).
+    """
+
+    def __init__(self, api_key: str, store: DatasetStore = None, concurrency: int = CONCURRENCY,
+                 n: int = PLACES_PER_JOB, checkpoint_path: str = CHECKPOINT_PATH, on_progress=None):
+        self.api_key = api_key
+        self.store = store or get_dataset_store()
+        self.concurrency = concurrency
+        self.n = n
+        self.checkpoint_path = checkpoint_path
+        self.on_progress = on_progress
+        self.progress = {}
+        # (business place, place_id) -> id of the job that stored it
+        self.owners = {}
+        self.completed = {}
+        self._lock = threading.Lock()
+
+    def load_checkpoint(self):
+        """
+        Restores finished jobs and the place ownership of their stored datasets.
+        """
+        if not os.path.exists(self.checkpoint_path):
+            return
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            self.completed = json.load(f)["completed"]
+        for job_id in self.completed:
+            business_place, country, city = job_id.split("|")
+            stored = self.store.load(business_place, country, city)
+            if stored is not None and len(stored[0]) != 0:
+                self.owners.update({(business_place, place_id): job_id for place_id in stored[0]["place_id"]})
+
+    def save_checkpoint(self):
+        if os.path.dirname(self.checkpoint_path):
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"completed": self.completed}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _update(self, progress: JobProgress, **changes):
+        with self._lock:
+            for name, value in changes.items():
+                setattr(progress, name, value)
+        if self.on_progress is not None:
+            self.on_progress(progress)
+
+    def _claim(self, progress: JobProgress, places):
+        """
+        :return: mask of the places not stored by another job of the business place yet;
+        those are now owned by the job
+        """
+        with self._lock:
+            keep = [self.owners.setdefault((progress.business_place, place_id), progress.job_id) == progress.job_id
+                    for place_id in places["place_id"]]
+        return keep
+
+    def run_job(self, progress: JobProgress):
+        job_id = progress.job_id
+        start = time.perf_counter()
+        self._update(progress, status="running")
+        loaded_data = ListingsAccumulator()
+        try:
+            location = f"{progress.city},+{progress.country}"
+            for places, reviews in get_places_data(self.api_key, progress.business_place, location, n=self.n):
+                keep = self._claim(progress, places)
+                kept_places = places[keep]
+                if len(reviews) != 0:
+                    # Reviews reference their listing by its 'id'
+                    reviews = reviews[reviews["place_id"].astype(int).isin(kept_places["id"].astype(int))]
+                loaded_data.append(kept_places, reviews)
+                self._update(progress, places=progress.places + len(kept_places),
+                             reviews=progress.reviews + len(reviews),
+                             duplicates=progress.duplicates + len(places) - len(kept_places),
+                             elapsed=time.perf_counter() - start)
+
+            self.store.save(progress.business_place, progress.country, progress.city,
+                            loaded_data.places_frame(), flag_duplicates(loaded_data.reviews_frame()))
+        except Exception as e:
+            # One failing market doesn't stop the crawl; it is retried when the crawl is resumed
+            with self._lock:
+                self.owners = {key: owner for key, owner in self.owners.items() if owner != job_id}
+            self._update(progress, status="failed", error=str(e), elapsed=time.perf_counter() - start)
+            return
+
+        self._update(progress, status="done", elapsed=time.perf_counter() - start)
+        with self._lock:
+            self.completed[job_id] = {"places": progress.places, "reviews": progress.reviews,
+                                      "duplicates": progress.duplicates}
+            self.save_checkpoint()
+
+    def run(self, jobs) -> dict:
+        """
+        Crawls every (business place, country, city) job not finished by a previous run.
+
+        :param jobs: iterable of (business place, country, city)
+        :return: JobProgress of every job by job id
+        """
+        self.load_checkpoint()
+        for business_place, country, city in jobs:
+            progress = JobProgress(business_place, country, city)
+            if progress.job_id in self.completed:
+                progress = JobProgress(business_place, country, city, status="done",
+                                       **self.completed[progress.job_id])
+            self.progress[progress.job_id] = progress
+
+        pending = [progress for progress in self.progress.values() if progress.status == "pending"]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(self.run_job, pending))
+        return self.progress
+
+
+def print_progress(progress: JobProgress):
+    line = (f"[{progress.status:>7}] {progress.business_place} in {progress.city}, {progress.country}: "
+            f"{progress.places} places, {progress.reviews} reviews, {progress.duplicates} duplicates "
+            f"({progress.elapsed:.1f} s)")
+    print(f"{line} - {progress.error}" if progress.error else line, flush=True)
+
+
+def sync_stored_reviews(api_key: str, jobs):
+    """
+    Runs an incremental review sync of every stored dataset among jobs.
+    """
+    store = get_dataset_store()
+    for business_place, country, city in jobs:
+        if (business_place, country, city) not in store:
+            continue
+        _, result = sync_reviews(api_key, business_place, country, city, store=store)
+        print(f"{business_place} in {city}, {country}: {result.new_reviews} new reviews from "
+              f"{result.places_checked} places ({result.places_skipped} synced recently, "
+              f"{result.places_failed} failed, {result.elapsed:.1f} s)", flush=True)
+
+
+def main():
+    from location_index import get_cities_names
+    from template.constants import query_map
+
+    parser = argparse.ArgumentParser(description="Crawl places and reviews into the local dataset store.")
+    parser.add_argument("--api-key", default=os.environ.get("API_KEY"), help="Google Places API key")
+    parser.add_argument("--country", required=True)
+    parser.add_argument("--cities", nargs="*", help="cities to crawl (default: every city of the country)")
+    parser.add_argument("--businesses", nargs="*", help="business places to crawl (default: all of them)")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--places", type=int, default=PLACES_PER_JOB, help="places per market")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--sync-reviews", action="store_true",
+                        help="only fetch the new reviews of the stored datasets of these markets")
+    args = parser.parse_args()
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or the API_KEY environment variable)")
+
+    cities = args.cities or get_cities_names(args.country)
+    businesses = args.businesses or list(query_map)
+    jobs = [(business_place, args.country, city) for business_place in businesses for city in cities]
+
+    if args.sync_reviews:
+        sync_stored_reviews(args.api_key, jobs)
+        return
+
+    crawler = Crawler(args.api_key, concurrency=args.concurrency, n=args.places,
+                      checkpoint_path=args.checkpoint, on_progress=print_progress)
+    progress = crawler.run(jobs)
+
+    summary = [asdict(job) for job in progress.values()]
+    failed = [job for job in summary if job["status"] == "failed"]
+    print(f"{len(summary) - len(failed)}/{len(summary)} markets done, "
+          f"{sum(job['places'] for job in summary)} places, {sum(job['reviews'] for job in summary)} reviews")
+    if failed:
+        print(f"{len(failed)} failed; run the same command again to retry them")
+
+
+if __name__ == "__main__":
+    main()
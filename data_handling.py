@@ -1,13 +1,175 @@
-import pandas as pd
+import math
+from bisect import insort
+
 import streamlit as st
 
+from dataset_cache import dataset_key, get_dataset_cache, load_dataset
+from dataset_store import get_dataset_store
+from http_client import PlacesApiError
+from review_cube import ReviewCube, updated_review_cube
+from review_quality import SignatureIndex, flag_duplicates
+from review_sync import sync_reviews
+
+
+class DataStore:
+    """
+    Registry of the datasets loaded in a session, keyed by (business place, country, city).
+    Keeps the business -> country -> sorted cities hierarchy used by the sidebars up to date on
+    every upsert, both for all datasets and for those whose reviews are loaded.
+    """
+
+    def __init__(self):
+        self.datasets = {}
+        self.hierarchy = {}
+        self.reviews_hierarchy = {}
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def __contains__(self, key):
+        return key in self.datasets
+
+    @staticmethod
+    def _add_to_hierarchy(hierarchy, business_place, country, city):
+        cities = hierarchy.setdefault(business_place, {}).setdefault(country, [])
+        if city not in cities:
+            insort(cities, city)
+
+    def upsert(self, business_place, country, city, **flags):
+        """
+        Registers a dataset, or updates the status flags of an existing one.
+
+        :param business_place: type of business
+        :param country: name of country
+        :param city: name of city
+        :param flags: status flags to set, e.g. reviews_loaded=True
+        :return: status flags of the dataset
+        """
+        key = (business_place, country, city)
+        status = self.datasets.get(key)
+        if status is None:
+            status = self.datasets[key] = {"reviews_loaded": False}
+            self._add_to_hierarchy(self.hierarchy, *key)
+        status.update(flags)
+        if status["reviews_loaded"]:
+            self._add_to_hierarchy(self.reviews_hierarchy, *key)
+        return status
+
+    def status(self, business_place, country, city):
+        return self.datasets.get((business_place, country, city))
+
+    def businesses(self, reviews_loaded=False):
+        hierarchy = self.reviews_hierarchy if reviews_loaded else self.hierarchy
+        return list(hierarchy)
+
+    def countries(self, business_place, reviews_loaded=False):
+        hierarchy = self.reviews_hierarchy if reviews_loaded else self.hierarchy
+        return list(hierarchy.get(business_place, {}))
+
+    def cities(self, business_place, country, reviews_loaded=False):
+        hierarchy = self.reviews_hierarchy if reviews_loaded else self.hierarchy
+        return hierarchy.get(business_place, {}).get(country, [])
+
+
 def update_data_store(city, country, business_place):
-    new_row = pd.DataFrame([{"City": city,
-                             "Country": country,
-                             "Business Point": business_place,
-                             "Reviews": 0}])
-    st.session_state['data_store'] = pd.concat([st.session_state['data_store'], new_row], ignore_index=True)
-    st.session_state['data_store'].drop_duplicates(inplace=True)
-
-def get_stored_data():
+    st.session_state['data_store'].upsert(business_place, country, city)
+
+
+def mark_reviews_loaded(city, country, business_place):
+    st.session_state['data_store'].upsert(business_place, country, city, reviews_loaded=True)
+
+
+def get_stored_data() -> DataStore:
     return st.session_state['data_store']
+
+
+def register_stored_datasets(data_store: DataStore):
+    """
+    Registers the datasets of the local store, e.g. collected by the crawler, in a session's DataStore.
+    Stored datasets include their reviews.
+    """
+    for business_place, country, city in get_dataset_store().keys():
+        data_store.upsert(business_place, country, city, reviews_loaded=True)
+
+
+def load_session_dataset(business_place, country, city, api_key):
+    """
+    Puts a dataset into the session, unless it is already there. It is read through the shared
+    dataset cache, so the session holds references to the frames every session shares.
+    Stored datasets are used however old they are, e.g. when collected by the crawler.
+    """
+    location = f'{city},+{country}'
+    if f'{location}-{business_place}-data' in st.session_state:
+        return
+    with st.spinner("Loading..."):
+        try:
+            dataset = load_dataset(business_place, country, city, api_key, max_age=math.inf)
+        except PlacesApiError as error:
+            st.error(f"Places API request failed ({error}). Please try again later.")
+            st.stop()
+    st.session_state[f'{location}-{business_place}-data'] = dataset.places
+    st.session_state[f'{location}-{business_place}-reviews'] = dataset.reviews
+
+
+def session_places(business_place, country, city, columns=None):
+    """
+    Listings of a dataset: the session's frame if it is loaded, otherwise only ``columns`` read from the store.
+
+    :param business_place: type of business
+    :param country: name of country
+    :param city: name of city
+    :param columns: columns needed when reading from the store, all by default
+    :return: listings DataFrame
+    """
+    places = st.session_state.get(f'{city},+{country}-{business_place}-data')
+    if places is None:
+        places = get_dataset_store().load_places(business_place, country, city, columns)
+    return places
+
+
+def session_reviews(location, business_place, exclude_duplicates=False):
+    """
+    The session's reviews of a dataset, with the reviews added since it was loaded (e.g. refetched
+    by the List View) passed through the review quality stage.
+
+    :param location: name of city and country
+    :param business_place: type of business
+    :param exclude_duplicates: leave out the reviews flagged as near-duplicates
+    :return: reviews DataFrame
+    """
+    index = st.session_state.setdefault(f'{location}-{business_place}-signatures', SignatureIndex())
+    reviews = flag_duplicates(st.session_state[f'{location}-{business_place}-reviews'], index)
+    st.session_state[f'{location}-{business_place}-reviews'] = reviews
+    return reviews[~reviews['duplicate']] if exclude_duplicates else reviews
+
+
+def session_review_cube(location, business_place, exclude_duplicates=False) -> ReviewCube:
+    """
+    Review rollups of the session's reviews of a dataset, built once and then only merged with
+    the reviews appended since.
+
+    :param location: name of city and country
+    :param business_place: type of business
+    :param exclude_duplicates: leave out the reviews flagged as near-duplicates
+    :return: ReviewCube
+    """
+    key = f'{location}-{business_place}-cube' + ('-unique' if exclude_duplicates else '')
+    cube = updated_review_cube(st.session_state.get(key), session_reviews(location, business_place, exclude_duplicates))
+    st.session_state[key] = cube
+    return cube
+
+
+def sync_session_reviews(business_place, country, city, api_key):
+    """
+    Appends the new reviews of a stored dataset and updates the session and the shared dataset cache.
+
+    :return: SyncResult
+    """
+    reviews, result = sync_reviews(api_key, business_place, country, city)
+    if reviews is not None and result.new_reviews != 0:
+        location = f'{city},+{country}'
+        places = get_dataset_store().load_places(business_place, country, city)
+        get_dataset_cache().put(dataset_key(business_place, location, api_key), places, reviews)
+        st.session_state[f'{location}-{business_place}-data'] = places
+        st.session_state[f'{location}-{business_place}-reviews'] = reviews
+    return result
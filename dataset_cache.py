@@ -0,0 +1,226 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from dataset_store import get_dataset_store
+from review_quality import flag_duplicates
+from utils import ListingsAccumulator, get_places_data
+
+# Memory budget of the datasets shared by all sessions of this process
+MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_MB", 512)) * 1024 * 1024
+# Seconds after which a dataset is fetched again
+DATASET_TTL = int(os.environ.get("DATASET_TTL", 24 * 60 * 60))
+# Datasets fetched in the background at the same time, by all sessions of this process
+LOADER_WORKERS = int(os.environ.get("DATASET_LOADER_WORKERS", 4))
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """
+    Listings and reviews of one (business place, location), shared read-only between sessions.
+    """
+    places: pd.DataFrame
+    reviews: pd.DataFrame
+    nbytes: int
+    loaded_at: datetime = field(default_factory=datetime.now)
+
+
+def dataset_key(business_place: str, location: str, api_key: str) -> tuple:
+    """
+    Cache key of a dataset. The API key is only kept as a hash.
+
+    :param business_place: type of business
+    :param location: name of city and country
+    :param api_key: Google Maps API key the dataset is fetched with
+    :return: (business place, location, API key hash)
+    """
+    return business_place, location, hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame, columns=None) -> str:
+    """
+    Content fingerprint of a DataFrame, used as an explicit cache key for data derived from it.
+
+    :param df: DataFrame
+    :param columns: columns to fingerprint, all by default
+    :return: hex digest
+    """
+    if columns is not None:
+        df = df[columns]
+    digest = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(), digest_size=16)
+    digest.update(",".join(map(str, df.columns)).encode())
+    return digest.hexdigest()
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum()) if len(df.columns) else 0
+
+
+class DatasetCache:
+    """
+    Process-wide LRU cache of loaded datasets keyed by ``dataset_key``, evicting the least
+    recently used ones once their total size exceeds ``max_bytes``; datasets older than ``ttl``
+    seconds are treated as missing.
+    Sessions keep references to the cached frames, so the frames must not be mutated.
+    """
+
+    def __init__(self, max_bytes: int = MAX_BYTES, ttl: int = DATASET_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.nbytes = 0
+        self._datasets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._datasets)
+
+    def get(self, key: tuple):
+        """
+        :param key: key from ``dataset_key``
+        :return: the cached Dataset, or None if it is missing or expired
+        """
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is None:
+                return None
+            if (datetime.now() - dataset.loaded_at).total_seconds() > self.ttl:
+                del self._datasets[key]
+                self.nbytes -= dataset.nbytes
+                return None
+            self._datasets.move_to_end(key)
+        return dataset
+
+    def put(self, key: tuple, places: pd.DataFrame, reviews: pd.DataFrame) -> Dataset:
+        """
+        Stores a dataset, evicting least recently used datasets over the memory budget.
+
+        :param key: key from ``dataset_key``
+        :param places: listings DataFrame
+        :param reviews: reviews DataFrame
+        :return: the stored Dataset
+        """
+        dataset = Dataset(places, reviews, frame_nbytes(places) + frame_nbytes(reviews))
+        with self._lock:
+            previous = self._datasets.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous.nbytes
+            self._datasets[key] = dataset
+            self.nbytes += dataset.nbytes
+            # Always keep the newest dataset, even if it alone exceeds the budget
+            while self.nbytes > self.max_bytes and len(self._datasets) > 1:
+                _, evicted = self._datasets.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+        return dataset
+
+    def stats(self) -> dict:
+        """
+        :return: number of cached datasets and their memory footprint in bytes
+        """
+        with self._lock:
+            return {"entries": len(self._datasets), "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+
+@st.cache_resource
+def get_dataset_cache() -> DatasetCache:
+    """
+    :return: the dataset cache shared by all sessions
+    """
+    return DatasetCache()
+
+
+def cached_dataset(business_place: str, country: str, city: str, api_key: str, max_age: float = None):
+    """
+    Returns the listings and reviews of a (business place, location) from the shared cache, or from the
+    local dataset store when it was saved within ``max_age``, without fetching anything.
+
+    :param business_place: type of business
+    :param country: name of country
+    :param city: name of city
+    :param api_key: Google Maps API key
+    :param max_age: seconds after saving a stored dataset is still used, the cache TTL by default
+    :return: the Dataset, or None if it has to be fetched
+    """
+    dataset_cache = get_dataset_cache()
+    key = dataset_key(business_place, f"{city},+{country}", api_key)
+    dataset = dataset_cache.get(key)
+    if dataset is not None:
+        return dataset
+
+    store = get_dataset_store()
+    saved_at = store.saved_at(business_place, country, city)
+    max_age = dataset_cache.ttl if max_age is None else max_age
+    if saved_at is not None and (datetime.now() - saved_at).total_seconds() <= max_age:
+        return dataset_cache.put(key, *store.load(business_place, country, city))
+    return None
+
+
+def load_dataset(business_place: str, country: str, city: str, api_key: str, on_batch=None,
+                 max_age: float = None) -> Dataset:
+    """
+    Returns the listings and reviews of a (business place, location), reading through the shared cache
+    and then the local dataset store; only datasets missing from both, or older than the TTL, are fetched.
+    Fetched datasets are saved to the store so they outlive the process; empty ones are not kept.
+
+    :param business_place: type of business
+    :param country: name of country
+    :param city: name of city
+    :param api_key: Google Maps API key
+    :param on_batch: called with the DataFrame of every new batch of places while fetching
+    :param max_age: seconds after saving a stored dataset is still used, the cache TTL by default
+    :return: the Dataset
+    """
+    dataset = cached_dataset(business_place, country, city, api_key, max_age)
+    if dataset is not None:
+        return dataset
+
+    location = f"{city},+{country}"
+    loaded_data = ListingsAccumulator()
+    for new_place_data, new_reviews_data in get_places_data(api_key, business_place, location=location):
+        loaded_data.append(new_place_data, new_reviews_data)
+        if on_batch is not None:
+            on_batch(new_place_data)
+
+    places, reviews = loaded_data.places_frame(), flag_duplicates(loaded_data.reviews_frame())
+    if places.empty:
+        # Nothing found (e.g. a ZERO_RESULTS search): neither stored nor cached, so the next run searches again
+        return Dataset(places, reviews, 0)
+    places, reviews = get_dataset_store().save(business_place, country, city, places, reviews)
+    return get_dataset_cache().put(dataset_key(business_place, location, api_key), places, reviews)
+
+
+@st.cache_resource
+def get_loader_pool() -> ThreadPoolExecutor:
+    """
+    :return: the thread pool datasets are fetched on in the background, shared by all sessions
+    """
+    return ThreadPoolExecutor(max_workers=LOADER_WORKERS, thread_name_prefix="dataset-loader")
+
+
+class DatasetLoader:
+    """
+    Fetches a dataset with ``load_dataset`` on the loader pool, so a session can draw the places
+    of every batch as it arrives while its script keeps running.
+    """
+
+    def __init__(self, business_place: str, country: str, city: str, api_key: str):
+        # Batches are only ever appended, so readers may take a prefix at any time
+        self.places_batches = []
+        self.future = get_loader_pool().submit(load_dataset, business_place, country, city, api_key,
+                                               on_batch=self.places_batches.append)
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self) -> Dataset:
+        """
+        :return: the loaded Dataset
+        :raises PlacesApiError: if fetching failed
+        """
+        return self.future.result()
@@ -0,0 +1,181 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Directory of the datasets persisted by the crawler and the Places Map tab
+STORE_PATH = os.environ.get("DATASET_STORE_PATH", os.path.join(".cache", "datasets"))
+
+# Compact dtypes of the stored pre_process_listings_data / pre_process_reviews output.
+# photo_url mixes URLs with the 0 fillna puts in for missing photos, so it is stored as text.
+LISTING_DTYPES = {"city": "category", "markerColor": "category", "latitude": "float32", "longitude": "float32",
+                  "averageRating": "float32", "totalReviews": "int32", "adjustedRating": "int8", "id": "int32",
+                  "photo_url": "str"}
+REVIEW_DTYPES = {"language": "category", "place_Name": "category", "rating": "float32", "photo_url": "str"}
+
+
+def compact_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """
+    :param df: DataFrame
+    :param dtypes: column -> dtype; columns missing from df are skipped
+    :return: df with the columns converted
+    """
+    dtypes = {column: dtype for column, dtype in dtypes.items() if column in df.columns}
+    return df.astype(dtypes) if dtypes else df
+
+
+class DatasetStore:
+    """
+    On-disk store of listings and reviews as Parquet files, one partition directory per dataset:
+    ``<root>/country=<country>/city=<city>/business=<business place>/{places,reviews}.parquet``.
+    Files are replaced atomically, so readers never see a half-written dataset, and are read
+    memory-mapped, optionally only a subset of their columns.
+    """
+
+    PARTS = ("country", "city", "business")
+
+    def __init__(self, root: str = STORE_PATH):
+        self.root = root
+
+    def partition_path(self, business_place: str, country: str, city: str) -> str:
+        return os.path.join(self.root, *(f"{part}={quote(value, safe=' ')}"
+                                         for part, value in zip(self.PARTS, (country, city, business_place))))
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self.partition_path(*key), "places.parquet"))
+
+    def keys(self) -> list:
+        """
+        :return: (business place, country, city) of every stored dataset
+        """
+        keys = []
+        for dirpath, _, filenames in os.walk(self.root):
+            if "places.parquet" not in filenames:
+                continue
+            values = dict(part.split("=", 1) for part in os.path.relpath(dirpath, self.root).split(os.sep))
+            keys.append(tuple(unquote(values[part]) for part in ("business", "country", "city")))
+        return sorted(keys)
+
+    def saved_at(self, business_place: str, country: str, city: str):
+        """
+        :return: when the dataset was last saved, or None if it isn't stored
+        """
+        path = os.path.join(self.partition_path(business_place, country, city), "places.parquet")
+        return datetime.fromtimestamp(os.path.getmtime(path)) if os.path.exists(path) else None
+
+    def save(self, business_place: str, country: str, city: str, places: pd.DataFrame, reviews: pd.DataFrame):
+        """
+        Writes (or replaces) a dataset, converting it to the compact dtypes first.
+
+        :param business_place: type of business
+        :param country: name of country
+        :param city: name of city
+        :param places: listings DataFrame
+        :param reviews: reviews DataFrame
+        :return: (listings DataFrame, reviews DataFrame) as stored
+        """
+        places, reviews = compact_dtypes(places, LISTING_DTYPES), compact_dtypes(reviews, REVIEW_DTYPES)
+        path = self.partition_path(business_place, country, city)
+        os.makedirs(path, exist_ok=True)
+        # Reviews first: a dataset counts as stored once its places file is in place
+        self._write(os.path.join(path, "reviews.parquet"), reviews)
+        self._write(os.path.join(path, "places.parquet"), places)
+        return places, reviews
+
+    def save_reviews(self, business_place: str, country: str, city: str, reviews: pd.DataFrame) -> pd.DataFrame:
+        """
+        Replaces the reviews of a stored dataset, keeping its listings.
+
+        :return: reviews DataFrame as stored
+        """
+        reviews = compact_dtypes(reviews, REVIEW_DTYPES)
+        self._write(os.path.join(self.partition_path(business_place, country, city), "reviews.parquet"), reviews)
+        return reviews
+
+    @staticmethod
+    @contextmanager
+    def _replacing(path: str):
+        """
+        Yields a temp file path next to ``path``, unique to the writer, moved over ``path`` once written.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            yield tmp_path
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _write(self, path: str, df: pd.DataFrame):
+        with self._replacing(path) as tmp_path:
+            pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path)
+
+    def load_watermarks(self, business_place: str, country: str, city: str) -> dict:
+        """
+        :return: review sync metadata of every place of a dataset, by Google place id
+        """
+        path = os.path.join(self.partition_path(business_place, country, city), "watermarks.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_watermarks(self, business_place: str, country: str, city: str, watermarks: dict):
+        path = os.path.join(self.partition_path(business_place, country, city), "watermarks.json")
+        with self._replacing(path) as tmp_path, open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(watermarks, f)
+
+    @staticmethod
+    def _read(path: str, columns=None) -> pd.DataFrame:
+        if columns is not None:
+            # Empty datasets are stored without columns
+            names = pq.read_schema(path, memory_map=True).names
+            columns = [column for column in columns if column in names]
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+    def load_places(self, business_place: str, country: str, city: str, columns=None):
+        """
+        :param business_place: type of business
+        :param country: name of country
+        :param city: name of city
+        :param columns: columns to read, all by default
+        :return: listings DataFrame, or None if the dataset isn't stored
+        """
+        path = os.path.join(self.partition_path(business_place, country, city), "places.parquet")
+        return self._read(path, columns) if os.path.exists(path) else None
+
+    def load_reviews(self, business_place: str, country: str, city: str, columns=None):
+        """
+        :param business_place: type of business
+        :param country: name of country
+        :param city: name of city
+        :param columns: columns to read, all by default
+        :return: reviews DataFrame, or None if the dataset isn't stored
+        """
+        path = os.path.join(self.partition_path(business_place, country, city), "reviews.parquet")
+        return self._read(path, columns) if os.path.exists(path) else None
+
+    def load(self, business_place: str, country: str, city: str):
+        """
+        :param business_place: type of business
+        :param country: name of country
+        :param city: name of city
+        :return: (listings DataFrame, reviews DataFrame), or None if the dataset isn't stored
+        """
+        places = self.load_places(business_place, country, city)
+        if places is None:
+            return None
+        return places, self.load_reviews(business_place, country, city)
+
+
+@lru_cache(maxsize=None)
+def get_dataset_store() -> DatasetStore:
+    return DatasetStore()
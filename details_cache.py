@@ -0,0 +1,113 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+
+# Location and limits of the persistent Place Details cache
+CACHE_PATH = os.environ.get("DETAILS_CACHE_PATH", os.path.join(".cache", "place_details.sqlite"))
+DEFAULT_TTL = 24 * 60 * 60
+MAX_ENTRIES = 20000
+
+
+class DetailsCache:
+    """
+    Persistent Place Details response cache stored in SQLite.
+    Entries are keyed by (place_id, fields), expire after ``ttl`` seconds and
+    the least recently used ones are evicted once ``max_entries`` is exceeded.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = DEFAULT_TTL, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                place_id TEXT NOT NULL,
+                fields TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (place_id, fields)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS details_accessed_at ON details (accessed_at)")
+
+    def get(self, place_id: str, fields: str):
+        """
+        Looks up a cached Place Details response.
+
+        :param place_id: Google place id
+        :param fields: field list the response was requested with
+        :return: decoded response, or None on a miss or an expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT payload, fetched_at FROM details WHERE place_id = ? AND fields = ?",
+                                     (place_id, fields)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM details WHERE place_id = ? AND fields = ?", (place_id, fields))
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE details SET accessed_at = ? WHERE place_id = ? AND fields = ?",
+                               (now, place_id, fields))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, place_id: str, fields: str, data: dict):
+        """
+        Stores a Place Details response and evicts least recently used entries over the size limit.
+
+        :param place_id: Google place id
+        :param fields: field list the response was requested with
+        :param data: decoded response
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?)",
+                               (place_id, fields, json.dumps(data), now, now))
+            self._conn.execute("""
+                DELETE FROM details WHERE rowid IN (
+                    SELECT rowid FROM details ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def stats(self) -> dict:
+        """
+        :return: hit/miss counters of this process and the number of stored entries
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM details")
+            self.hits = 0
+            self.misses = 0
+
+
+@lru_cache(maxsize=None)
+def get_details_cache() -> DetailsCache:
+    """
+    :return: the process-wide Place Details cache
+    """
+    return DetailsCache()
@@ -0,0 +1,86 @@
+import base64
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Typed array dtypes understood by plotly.js
+TYPED_ARRAY_DTYPES = {"int8": "i1", "uint8": "u1", "int16": "i2", "uint16": "u2", "int32": "i4", "uint32": "u4",
+                      "float32": "f4", "float64": "f8"}
+# Trace attributes holding per-point arrays
+ARRAY_ATTRIBUTES = ("x", "y", "z", "customdata", "values")
+MARKER_ARRAY_ATTRIBUTES = ("size", "color", "opacity")
+
+
+def typed_array(values: np.ndarray) -> dict:
+    """
+    :param values: 1-d or 2-d numeric array
+    :return: plotly.js typed array spec: base64 of the raw values with their dtype and shape
+    """
+    if values.dtype.kind in "iu" and values.dtype.name not in TYPED_ARRAY_DTYPES:
+        # No 64-bit integer typed arrays in plotly.js
+        fits = len(values) == 0 or np.iinfo(np.int32).min <= values.min() <= values.max() <= np.iinfo(np.int32).max
+        values = values.astype(np.int32 if fits else np.float64)
+    values = np.ascontiguousarray(values)
+    spec = {"dtype": TYPED_ARRAY_DTYPES[values.dtype.name], "bdata": base64.b64encode(values.tobytes()).decode()}
+    if values.ndim > 1:
+        spec["shape"] = ",".join(map(str, values.shape))
+    return spec
+
+
+def compact_values(values):
+    """
+    :param values: trace attribute value
+    :return: (typed array spec or values unchanged, whether the values were dates)
+    """
+    if not isinstance(values, np.ndarray) or values.ndim > 2:
+        return values, False
+    if values.dtype.kind == "O" and values.ndim == 1 and pd.api.types.infer_dtype(values) in ("datetime64", "datetime"):
+        # Dates as milliseconds since the epoch, read as dates by a 'date' axis
+        return typed_array(pd.to_datetime(values).asi8.astype(np.float64) / 1e6), True
+    if values.dtype.kind == "M":
+        return typed_array(values.astype("datetime64[ms]").astype(np.int64).astype(np.float64)), True
+    if values.dtype.kind in "iuf" and values.dtype.itemsize <= 8:
+        if values.dtype.kind == "f" and values.dtype != np.float32:
+            # Single precision is well beyond what a chart shows, at half the bytes
+            values = values.astype(np.float32)
+        return typed_array(values), False
+    return values, False
+
+
+def compact_figure(fig: go.Figure) -> dict:
+    """
+    Serializes a figure with its numeric per-point arrays as typed arrays instead of JSON number lists.
+
+    :param fig: Plotly figure
+    :return: figure dict ready to be sent as JSON
+    """
+    spec = fig.to_dict()
+    layout = spec.setdefault("layout", {})
+    for trace in spec["data"]:
+        for attribute in ARRAY_ATTRIBUTES:
+            if attribute not in trace:
+                continue
+            trace[attribute], dates = compact_values(trace[attribute])
+            if dates and attribute in ("x", "y"):
+                axis = trace.get(f"{attribute}axis", attribute)
+                layout.setdefault(f"{axis[0]}axis{axis[1:]}", {})["type"] = "date"
+        marker = trace.get("marker", {})
+        for attribute in MARKER_ARRAY_ATTRIBUTES:
+            if attribute in marker:
+                marker[attribute], _ = compact_values(marker[attribute])
+    return spec
+
+
+class SerializedFigure(go.Figure):
+    """
+    Figure standing in for an already serialized figure dict: st.plotly_chart sends what
+    ``to_dict`` returns, so the figure isn't validated and serialized again.
+    """
+
+    def __init__(self, spec: dict):
+        super().__init__()
+        self._spec = spec
+
+    def to_dict(self):
+        return self._spec
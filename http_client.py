@@ -0,0 +1,218 @@
+import asyncio
+import os
+import time
+from functools import lru_cache
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+from details_cache import DetailsCache, get_details_cache
+from rate_limit import MAX_RETRIES, PageTokenPacer, TokenBucket, backoff_delay, get_page_token_pacer, get_rate_limiter
+
+# Base URL of the Places web service; can be pointed at a proxy or stub server
+PLACES_API_URL = os.environ.get("PLACES_API_URL", "https://maps.googleapis.com/maps/api/place")
+
+# Fields requested for every Place Details call
+DETAILS_FIELDS = "name,formatted_address,geometry,international_phone_number,rating,user_ratings_total,reviews"
+
+# Connection settings shared by the sync and async clients
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 15
+POOL_SIZE = 10
+KEEPALIVE_TIMEOUT = 30
+
+# Response statuses retried after a backoff; INVALID_REQUEST is also retried for a next_page_token
+# that is not valid yet
+RETRY_STATUSES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class PlacesApiError(Exception):
+    """
+    Raised when the Places API keeps answering with an error status.
+    """
+
+    def __init__(self, status: str, message: str = ""):
+        super().__init__(f"{status}: {message}" if message else status)
+        self.status = status
+
+
+class PlacesClient:
+    """
+    Blocking Places API client backed by one keep-alive ``requests.Session``.
+    Connections are pooled per host, so consecutive calls reuse the same TCP/TLS connection.
+    Place Details responses are read through ``cache`` when one is given.
+    Requests are paced by ``rate_limiter`` and retried with jittered exponential backoff on
+    retryable statuses; a ``next_page_token`` is first used after the wait learned by
+    ``page_token_pacer``, then polled until it turns valid.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, pool_size: int = POOL_SIZE, cache: DetailsCache = None,
+                 rate_limiter: TokenBucket = None, page_token_pacer: PageTokenPacer = None):
+        self.api_key = api_key
+        self.base_url = base_url or PLACES_API_URL
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.page_token_pacer = page_token_pacer or PageTokenPacer()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def text_search_url(self, query: str, page_token: str = None) -> str:
+        url = f"{self.base_url}/textsearch/json?query={query}&key={self.api_key}"
+        if page_token:
+            url += f"&pagetoken={page_token}"
+        return url
+
+    def details_url(self, place_id: str, fields: str = DETAILS_FIELDS, reviews_sort: str = None) -> str:
+        url = f"{self.base_url}/details/json?place_id={place_id}&fields={fields}&key={self.api_key}"
+        if reviews_sort:
+            url += f"&reviews_sort={reviews_sort}"
+        return url
+
+    def photo_url(self, photo_reference: str, max_width: int = 100) -> str:
+        return f"{self.base_url}/photo?maxwidth={max_width}&photoreference={photo_reference}&key={self.api_key}"
+
+    def _cached_details(self, place_id: str, fields: str):
+        if self.cache is None:
+            return None
+        return self.cache.get(place_id, fields)
+
+    def _store_details(self, place_id: str, fields: str, details_data: dict):
+        # Only successful responses are cached; errors and quota failures are retried next time
+        if self.cache is not None and details_data.get('status') == 'OK':
+            self.cache.put(place_id, fields, details_data)
+
+    @staticmethod
+    def _should_retry(data: dict, page_token: str = None) -> bool:
+        status = data.get('status')
+        return status in RETRY_STATUSES or (page_token is not None and status == 'INVALID_REQUEST')
+
+    def _page_token_wait(self, page_token: str = None) -> float:
+        return self.page_token_pacer.wait(page_token)
+
+    def _track_page_tokens(self, data: dict, page_token: str, attempts: int):
+        self.page_token_pacer.track(data.get('next_page_token'), page_token, data.get('status') == 'OK', attempts)
+
+    def _get_json(self, url: str, page_token: str = None) -> tuple:
+        """
+        GETs a Places API URL, retrying retryable statuses with backoff.
+
+        :param url: request URL
+        :param page_token: page token the request uses, if any
+        :return: (decoded JSON response, number of retries)
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            data = self.session.get(url, timeout=self.timeout).json()
+            if attempt == MAX_RETRIES or not self._should_retry(data, page_token):
+                return data, attempt
+            time.sleep(backoff_delay(attempt))
+
+    def text_search(self, query: str, page_token: str = None) -> dict:
+        """
+        Runs a Place Text Search request.
+
+        :param query: search query, e.g. ``cafes+in+Lahore,+Pakistan``
+        :param page_token: ``next_page_token`` of the previous page, if any
+        :return: decoded JSON response
+        """
+        time.sleep(self._page_token_wait(page_token))
+        search_data, attempts = self._get_json(self.text_search_url(query, page_token), page_token)
+        self._track_page_tokens(search_data, page_token, attempts)
+        return search_data
+
+    def place_details(self, place_id: str, fields: str = DETAILS_FIELDS, reviews_sort: str = None,
+                      refresh: bool = False) -> dict:
+        """
+        Runs a Place Details request.
+
+        :param place_id: Google place id
+        :param fields: comma separated list of fields to request
+        :param reviews_sort: order of the returned reviews, 'most_relevant' (API default) or 'newest'
+        :param refresh: skip the cached response, if any, and store the fresh one
+        :return: decoded JSON response
+        """
+        # Responses with another review order are cached separately
+        cache_fields = f"{fields};{reviews_sort}" if reviews_sort else fields
+        details_data = None if refresh else self._cached_details(place_id, cache_fields)
+        if details_data is None:
+            details_data, _ = self._get_json(self.details_url(place_id, fields, reviews_sort))
+            self._store_details(place_id, cache_fields, details_data)
+        return details_data
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncPlacesClient(PlacesClient):
+    """
+    asyncio variant of :class:`PlacesClient` backed by one ``aiohttp.ClientSession``.
+    Must be used as an async context manager inside the event loop that issues the requests.
+    """
+
+    def __init__(self, api_key: str, base_url: str = None, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, pool_size: int = POOL_SIZE, cache: DetailsCache = None,
+                 rate_limiter: TokenBucket = None, page_token_pacer: PageTokenPacer = None):
+        self.api_key = api_key
+        self.base_url = base_url or PLACES_API_URL
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.page_token_pacer = page_token_pacer or PageTokenPacer()
+        self.pool_size = pool_size
+        self.session = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=KEEPALIVE_TIMEOUT)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+
+    async def _get_json(self, url: str, page_token: str = None) -> tuple:
+        for attempt in range(MAX_RETRIES + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            async with self.session.get(url) as response:
+                data = await response.json(content_type=None)
+            if attempt == MAX_RETRIES or not self._should_retry(data, page_token):
+                return data, attempt
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def text_search(self, query: str, page_token: str = None) -> dict:
+        await asyncio.sleep(self._page_token_wait(page_token))
+        search_data, attempts = await self._get_json(self.text_search_url(query, page_token), page_token)
+        self._track_page_tokens(search_data, page_token, attempts)
+        return search_data
+
+    async def place_details(self, place_id: str, fields: str = DETAILS_FIELDS, reviews_sort: str = None,
+                            refresh: bool = False) -> dict:
+        cache_fields = f"{fields};{reviews_sort}" if reviews_sort else fields
+        details_data = None if refresh else self._cached_details(place_id, cache_fields)
+        if details_data is None:
+            details_data, _ = await self._get_json(self.details_url(place_id, fields, reviews_sort))
+            self._store_details(place_id, cache_fields, details_data)
+        return details_data
+
+    async def close(self):
+        await self.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_places_client(api_key: str) -> PlacesClient:
+    """
+    Returns the process-wide blocking client for an API key, so every caller shares one
+    connection pool, rate limiter and page token pacer, and reads Place Details through the persistent cache.
+
+    :param api_key: Google Maps API key
+    :return: shared PlacesClient
+    """
+    return PlacesClient(api_key, cache=get_details_cache(), rate_limiter=get_rate_limiter(api_key),
+                        page_token_pacer=get_page_token_pacer(api_key))
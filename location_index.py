@@ -0,0 +1,67 @@
+import json
+import os
+from functools import lru_cache
+
+# Prebuilt country -> state -> city index, written once and reused by every process
+INDEX_PATH = os.environ.get("LOCATION_INDEX_PATH", os.path.join(".cache", "location_index.json"))
+INDEX_VERSION = 1
+
+
+def build_location_index() -> dict:
+    """
+    Builds the country -> state -> sorted cities index in one pass over the geosky dataset.
+
+    :return: dict of countries (in dataset order) to dicts of states to sorted city lists
+    """
+    # geosky downloads its whole dataset on import, so only import it when (re)building the index
+    from geosky import geo_plug
+
+    index = {}
+    for entry in geo_plug.data:
+        states = index.setdefault(entry['country'], {})
+        states.setdefault(entry['subcountry'], set()).add(entry['name'])
+
+    return {country: {state: sorted(cities) for state, cities in states.items()}
+            for country, states in index.items()}
+
+
+@lru_cache(maxsize=None)
+def load_location_index(path: str = INDEX_PATH) -> dict:
+    """
+    Loads the location index from disk, building and saving it on first use.
+
+    :param path: location of the serialized index
+    :return: dict with 'states' (country -> state -> cities) and 'cities' (country -> sorted cities)
+    """
+    states = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("version") == INDEX_VERSION:
+            states = stored["countries"]
+
+    if states is None:
+        states = build_location_index()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written aside and moved into place, so a concurrent reader never sees a partial index
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "countries": states}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    cities = {country: tuple(sorted({city for state_cities in country_states.values() for city in state_cities}))
+              for country, country_states in states.items()}
+    return {"states": states, "cities": cities}
+
+
+def get_country_names() -> list:
+    return list(load_location_index()["cities"])
+
+
+def get_cities_names(country: str) -> tuple:
+    """
+    :param country: name of country
+    :return: sorted names of the cities in the country
+    """
+    return load_location_index()["cities"].get(country, ())
@@ -0,0 +1,220 @@
+import re
+
+import numpy as np
+import pandas as pd
+from branca.element import MacroElement
+from jinja2 import Template
+
+from template.html import POPUP
+
+# Columns sent to the browser for every place, in payload order
+PLACE_FIELDS = ["latitude", "longitude", "markerColor", "photo_url", "name", "address",
+                "averageRating", "totalReviews", "contact"]
+
+# POPUP with numbered placeholders, filled client side from the payload row
+POPUP_TEMPLATE = re.sub(r"\s+", " ", POPUP).format(*[f"{{{i}}}" for i in range(3, 9)])
+
+
+def place_rows(df: pd.DataFrame, fields=PLACE_FIELDS) -> list:
+    """
+    Converts places to compact JSON-serializable rows.
+
+    :param df: DataFrame of places
+    :param fields: columns to include, in order
+    :return: list of rows with the values of ``fields``, empty when there are no places
+    """
+    if df.empty or not set(fields).issubset(df.columns):
+        return []
+    columns = []
+    for field in fields:
+        values = df[field]
+        if pd.api.types.is_float_dtype(values):
+            columns.append(values.astype(float).round(6).tolist())
+        elif pd.api.types.is_integer_dtype(values):
+            columns.append(values.astype(int).tolist())
+        else:
+            columns.append(values.astype(str).tolist())
+    return [list(row) for row in zip(*columns)]
+
+
+def places_bounds(df: pd.DataFrame) -> list:
+    """
+    :param df: DataFrame of places with latitude and longitude columns
+    :return: [[south, west], [north, east]] bounds of the places, or None when there are none
+    """
+    if df.empty or "latitude" not in df or "longitude" not in df:
+        return None
+    lat = df["latitude"].to_numpy(dtype=float)
+    lng = df["longitude"].to_numpy(dtype=float)
+    return [[float(np.min(lat)), float(np.min(lng))], [float(np.max(lat)), float(np.max(lng))]]
+
+
+def merge_bounds(bounds, other) -> list:
+    """
+    :param bounds: [[south, west], [north, east]] bounds, or None
+    :param other: bounds to extend them with, or None
+    :return: bounds covering both
+    """
+    if bounds is None:
+        return other
+    if other is None:
+        return bounds
+    return [[min(bounds[0][0], other[0][0]), min(bounds[0][1], other[0][1])],
+            [max(bounds[1][0], other[1][0]), max(bounds[1][1], other[1][1])]]
+
+
+class PlacesLayer(MacroElement):
+    """
+    Marker layer drawn in the browser from one compact JSON payload.
+    Each marker's popup is built from a single HTML template only when it is opened,
+    instead of embedding an IFrame per marker.
+    With ``circles=True`` places are drawn as circle markers filled with the colour of the
+    payload's third field and sized by an extra tenth ``radius`` field.
+    With ``offset`` set, the layer is meant for a feature group that st_folium swaps on every update:
+    its markers go to one layer kept on the map instead, the rows being places ``offset`` on of the map,
+    so each update only has to carry the places the map doesn't show yet.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            var template = {{ this.popup_template|tojson }};
+            var escape = function(value) {
+                return String(value).replace(/[&<>"']/g, function(c) {
+                    return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[c];
+                });
+            };
+            {% if this.offset is not none %}
+            var map = {{ this._parent._parent.get_name() }};
+            var layer = map.placesLayer = map.placesLayer || L.featureGroup().addTo(map);
+            // Rows the map already has, e.g. resent after a rerun, are skipped
+            var rows = {{ this.rows|tojson }}.slice(Math.max((layer.count || 0) - {{ this.offset }}, 0));
+            layer.count = Math.max(layer.count || 0, {{ this.offset + this.rows|length }});
+            {% else %}
+            var layer = L.featureGroup();
+            var rows = {{ this.rows|tojson }};
+            {% endif %}
+            rows.forEach(function(row) {
+                {% if this.circles %}
+                var marker = L.circleMarker([row[0], row[1]], {
+                    radius: row[9], fill: true, fillColor: row[2], fillOpacity: 0.6
+                });
+                {% else %}
+                var marker = L.marker([row[0], row[1]], {
+                    icon: L.AwesomeMarkers.icon({icon: {{ this.icon|tojson }}, prefix: "fa", markerColor: row[2]})
+                });
+                marker.bindTooltip(escape(row[4]));
+                {% endif %}
+                marker.bindPopup(function() {
+                    return template.replace(/\\{(\\d+)\\}/g, function(_, i) { return escape(row[i]); });
+                }, {minWidth: 150, maxWidth: 300});
+                layer.addLayer(marker);
+            });
+            {% if this.offset is not none %}
+            if (rows.length) {
+                map.fitBounds(layer.getBounds());
+            }
+            {% endif %}
+            return layer;
+        })(){% if this.offset is none %}.addTo({{ this._parent.get_name() }}){% endif %};
+        {% endmacro %}
+    """)
+
+    def __init__(self, icon: str = None, popup_template: str = POPUP_TEMPLATE, circles: bool = False,
+                 offset: int = None):
+        super().__init__()
+        self._name = "PlacesLayer"
+        self.icon = icon
+        self.popup_template = popup_template
+        self.circles = circles
+        self.offset = offset
+        self.rows = []
+
+    def append(self, df: pd.DataFrame, fields=PLACE_FIELDS):
+        """
+        Appends places to the layer; rows already added are kept as they are.
+
+        :param df: DataFrame of places with the PLACE_FIELDS columns
+        :param fields: columns to send, in payload order
+        """
+        self.rows.extend(place_rows(df, fields))
+
+
+def grid_cells(df: pd.DataFrame, precision: int = 5) -> pd.DataFrame:
+    """
+    Bins places into the cells of a geohash grid of the given precision and aggregates every cell.
+    Geohash precision p splits longitude into ceil(5p / 2) bits and latitude into floor(5p / 2) bits.
+
+    :param df: DataFrame of places with latitude, longitude, averageRating and totalReviews columns
+    :param precision: geohash precision (5 is roughly 4.9 km x 4.9 km)
+    :return: DataFrame with one row per non-empty cell: its bounds, centre, count of places,
+    mean averageRating and summed totalReviews
+    """
+    lat_bits, lng_bits = (5 * precision) // 2, (5 * precision + 1) // 2
+    lat_cells, lng_cells = 1 << lat_bits, 1 << lng_bits
+
+    lat = df["latitude"].to_numpy(dtype=float)
+    lng = df["longitude"].to_numpy(dtype=float)
+    lat_idx = np.clip(((lat + 90) / 180 * lat_cells).astype(np.int64), 0, lat_cells - 1)
+    lng_idx = np.clip(((lng + 180) / 360 * lng_cells).astype(np.int64), 0, lng_cells - 1)
+
+    cells, inverse = np.unique((lng_idx << lat_bits) | lat_idx, return_inverse=True)
+    count = np.bincount(inverse)
+    rating_sum = np.bincount(inverse, weights=df["averageRating"].to_numpy(dtype=float))
+    reviews_sum = np.bincount(inverse, weights=df["totalReviews"].to_numpy(dtype=float))
+
+    cell_lat_idx, cell_lng_idx = cells & (lat_cells - 1), cells >> lat_bits
+    lat_size, lng_size = 180 / lat_cells, 360 / lng_cells
+    south, west = cell_lat_idx * lat_size - 90, cell_lng_idx * lng_size - 180
+
+    return pd.DataFrame({
+        "cell": cells,
+        "south": south, "west": west, "north": south + lat_size, "east": west + lng_size,
+        "latitude": south + lat_size / 2, "longitude": west + lng_size / 2,
+        "count": count,
+        "averageRating": rating_sum / count,
+        "totalReviews": reviews_sum.astype(np.int64),
+    })
+
+
+class GridCellsLayer(MacroElement):
+    """
+    Aggregated grid cells shown instead of a points layer below ``max_zoom``.
+    Cells are coloured by mean rating and drawn client side from one payload.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        var {{ this.get_name() }} = (function() {
+            var map = {{ this._parent.get_name() }};
+            var points = {{ this.points.get_name() }};
+            var cells = L.featureGroup();
+            {{ this.rows|tojson }}.forEach(function(row) {
+                var color = row[5] >= 4 ? "blue" : (row[5] >= 3 ? "yellow" : "red");
+                L.rectangle([[row[0], row[1]], [row[2], row[3]]], {
+                    color: color, weight: 1, fillColor: color, fillOpacity: 0.5
+                }).bindPopup("Places: " + row[4] + "<br>Avg. Rating: " + row[5].toFixed(2) +
+                             "<br>Reviews: " + row[6]).addTo(cells);
+            });
+            var toggle = function() {
+                if (map.getZoom() < {{ this.max_zoom }}) {
+                    map.removeLayer(points);
+                    cells.addTo(map);
+                } else {
+                    map.removeLayer(cells);
+                    points.addTo(map);
+                }
+            };
+            map.on("zoomend", toggle);
+            toggle();
+            return cells;
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, cells: pd.DataFrame, points, max_zoom: int = 11):
+        super().__init__()
+        self._name = "GridCellsLayer"
+        self.points = points
+        self.max_zoom = max_zoom
+        self.rows = place_rows(cells, ["south", "west", "north", "east", "count", "averageRating", "totalReviews"])
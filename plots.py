@@ -1,13 +1,17 @@
+import io
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-from matplotlib import pyplot as plt
-from wordcloud import WordCloud
+import streamlit as st
 
-from template.html import POPUP
-from utils import insert_sentiment_scores
+from dataset_cache import frame_fingerprint
+from figure_payload import SerializedFigure, compact_figure
+from map_layers import PLACE_FIELDS, GridCellsLayer, PlacesLayer, grid_cells, places_bounds
+from ranking import market_scores
+from sentiment import sentiment_scores
 import folium
-from folium.plugins import MarkerCluster
+from folium.plugins import FastMarkerCluster
 from streamlit_folium import folium_static
 
 
@@ -15,6 +19,25 @@ COLORS = ["#0081a7", "#00afb9", "#f07167", "#e9c46a", "#264653",
           "#f4a261", "#e76f51", "#ef233c", "#fed9b7", "#f6bd60",
           "#84a59d", "#f95738", "#fdfcdc", ]
 
+# Geohash precision of the aggregated cells and the zoom level from which single points are shown
+GRID_PRECISION = 5
+GRID_MAX_ZOOM = 11
+GRID_COLUMNS = ["latitude", "longitude", "averageRating", "totalReviews"]
+
+# Points from which the sentiment scatter is drawn with WebGL
+SCATTERGL_MIN_POINTS = 1000
+# Review columns the sentiment scatter reads
+SENTIMENT_COLUMNS = ["datetime", "rating", "language", "text"]
+
+# Creates a cluster marker from a [latitude, longitude, popup html] row
+CLUSTER_MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    return marker;
+}
+"""
+
 
 def update_layout(fig: go.Figure, x_label: str, y_label: str, title: str) -> go.Figure:
     """
@@ -39,45 +62,43 @@ def update_layout(fig: go.Figure, x_label: str, y_label: str, title: str) -> go.
     return fig
 
 
-def reviews_wordcloud(df: pd.DataFrame) -> plt.figure:
+@st.cache_data(max_entries=200)
+def reviews_wordcloud(_frequencies: dict, fingerprint: str) -> bytes:
     """
-    Generate a word cloud to visualize frequent words in a DataFrame of reviews.
+    Generate a word cloud to visualize frequent words in reviews. The PNG is cached by the
+    fingerprint of the term frequencies, so a place is only drawn again once its reviews change.
 
-    :param df: The input DataFrame containing review data.
-    :return: A matplotlib figure representing the word cloud
+    :param _frequencies: term -> count in the reviews of a place (ReviewCube.term_frequencies)
+    :param fingerprint: fingerprint of _frequencies
+    :return: PNG image of the word cloud
     """
-    wordcloud = WordCloud(background_color='white', min_font_size=5)
+    # wordcloud and matplotlib are only needed on the Reviews Analytics tab
+    from matplotlib.figure import Figure
+    from wordcloud import WordCloud
 
-    text = ' '.join(df['text'])
-    if len(text) == 0:
-        text = 'Null'
-
-    wordcloud.generate(text)
+    wordcloud = WordCloud(background_color='white', min_font_size=5)
+    wordcloud.generate_from_frequencies(_frequencies or {'Null': 1})
 
-    # Convert the word cloud to an image
-    fig = plt.figure(facecolor=None)
-    plt.imshow(wordcloud, interpolation="bilinear")
-    plt.axis("off")
-    plt.tight_layout(pad=10)
-    plt.title("Frequent Words in Reviews")
+    # A Figure of its own rather than pyplot's global state, which concurrent sessions would share
+    fig = Figure(facecolor=None)
+    ax = fig.add_subplot()
+    ax.imshow(wordcloud, interpolation="bilinear")
+    ax.axis("off")
+    ax.set_title("Frequent Words in Reviews")
+    fig.tight_layout(pad=10)
 
-    return fig
+    image = io.BytesIO()
+    fig.savefig(image, format="png", bbox_inches="tight")
+    return image.getvalue()
 
 
-def average_rating_overtime(df):
+def average_rating_overtime(avg_rating: pd.DataFrame) -> go.Figure:
     """
     Function to plot Bar Chart to visualize average rating
     w.r.t Quarters for each year
-    :param df: The input DataFrame containing review data.
+    :param avg_rating: year, quarter and average rating of a place (ReviewCube.quarterly)
     :return: A Plotly Figure representing average distribution overtime.
     """
-
-    df['year'] = df['datetime'].dt.year
-    df['quarter'] = df['datetime'].dt.quarter
-
-    # Calculate average rating for each year and quarter
-    avg_rating = df.groupby(['year', 'quarter'])['rating'].mean().reset_index()
-
     # Create a Plotly Go figure
     fig = go.Figure()
 
@@ -96,28 +117,20 @@ def average_rating_overtime(df):
     return fig
 
 
-def average_rating_wrt_month_year(df):
+def average_rating_wrt_month_year(avg_rating: pd.DataFrame) -> go.Figure:
     """
     Function to plot Bar Chart to visualize average rating
     w.r.t Months for each year
-    :param df: The input DataFrame containing review data.
+    :param avg_rating: year, month_num, month_year and average rating of a place (ReviewCube.monthly)
     :return: A Plotly Figure representing average distribution overtime.
     """
-    df['year'] = df['datetime'].dt.year
-    df['month_num'] = df['datetime'].dt.month
-    df['month_year'] = df['datetime'].dt.strftime("%b %Y")
-
-    # Calculate average rating for each year and month
-    avg_rating = df.groupby(['year', 'month_num', 'month_year'])['rating'].mean().reset_index()
-
     fig = go.Figure()
 
     years = sorted(list(avg_rating['year'].unique()))
     # Add a bar trace for each month
     ind = 0
     for year in years:
-        year_data = avg_rating[avg_rating['year'] == year]
-        year_data.sort_values(by='month_num', inplace=True)
+        year_data = avg_rating[avg_rating['year'] == year].sort_values(by='month_num')
         fig.add_trace(go.Bar(
             x=year_data['month_year'],
             y=year_data['rating'],
@@ -131,22 +144,20 @@ def average_rating_wrt_month_year(df):
     return fig
 
 
-def rating_breakdown_pie(df: pd.DataFrame) -> go.Figure:
+def rating_breakdown_pie(histogram: pd.DataFrame) -> go.Figure:
     """
     Generate a pie chart to visualize the breakdown of reviews by rating.
-    :param df: The input DataFrame containing review data.
+    :param histogram: rating and review count of a place (ReviewCube.rating_histogram)
     :return: A Plotly Figure representing the breakdown of reviews by rating.
     """
-    df = df.groupby("rating")["text"].count().reset_index()
-    df["rating"] = df["rating"].astype(int)
-    df["Rating-Formatted"] = df["rating"].map({
+    df = histogram.assign(rating=histogram["rating"].astype(int)).sort_values(by="rating")
+    labels = df["rating"].map({
         5: "⭐ 5 😊", 4: "⭐ 4 🙂", 3: "⭐ 3 😕", 2: "⭐ 2 😒", 1: "⭐ 1 😑"
     })
-    df.sort_values(by="rating", ascending=True, inplace=True)
     fig = go.Figure(
         go.Pie(
-            labels=df["Rating-Formatted"],
-            values=df["text"],
+            labels=labels,
+            values=df["count"],
             hole=0.3,
             sort=False
         )
@@ -164,10 +175,11 @@ def sentiment_score_overtime(df):
     :param df: The input DataFrame containing review data.
     :return: A Plotly Figure representing sentiment score overtime.
     """
-    df = insert_sentiment_scores(df)
+    df = df.assign(sentiment_score=sentiment_scores(df))
+    scatter = go.Scattergl if len(df) >= SCATTERGL_MIN_POINTS else go.Scatter
     fig = go.Figure()
     fig.add_trace(
-        go.Scatter(
+        scatter(
             x=df["datetime"],
             y=df["sentiment_score"],
             name="Sentiment Score",
@@ -183,38 +195,33 @@ def sentiment_score_overtime(df):
     return fig
 
 
-def top_performing_places(df):
-    """
-    Function to plot a bar chart of top-performing places based on reviews, ratings, and reliability.
-    :param df: The input DataFrame containing review data.
-    :return: A Plotly Figure representing top places with their satisfaction and reliability scores.
+@st.cache_data(max_entries=100)
+def cached_market_scores(_df, fingerprint: str, market: str) -> pd.DataFrame:
     """
-    # Drop rows with missing average ratings
-    df = df.dropna(subset=["averageRating"])
-
-    # Aggregate data by place name
-    df = df.groupby("name").agg({
-        "averageRating": "mean",
-        "totalReviews": "sum"
-    }).reset_index()
-
-    # Filter places with total reviews above certain range
-    thresh = df["totalReviews"].quantile(0.40)
-    df = df[df["totalReviews"] >= thresh]
+    Ranking scores of a market, cached by the dataset's fingerprint.
 
-    # Calculate Satisfaction Score
-    df['Satisfaction Score'] = (df['averageRating'] * df['totalReviews']) / df['totalReviews'].sum()
-    max_score = df['Satisfaction Score'].max()
-    df['Relative Satisfaction Score'] = (df['Satisfaction Score'] / max_score) * 100
+    :param _df: The input DataFrame containing places data (not hashed).
+    :param fingerprint: fingerprint of the ranking columns of _df
+    :param market: label of the market
+    :return: market_scores DataFrame
+    """
+    return market_scores(_df, market)
 
-    # Calculate Reliability Score
-    df['Reliability Score'] = df['averageRating'] * np.log1p(df['totalReviews'])
 
-    # Sort places by Relative Satisfaction Score
-    df.sort_values(by="Relative Satisfaction Score", ascending=False, inplace=True)
+def top_performing_places(ranked: pd.DataFrame) -> go.Figure:
+    """
+    Function to plot a bar chart of top-performing places based on reviews, ratings, and reliability.
+    :param ranked: top places from rank_places; places of several markets are labelled with their market
+    :return: A Plotly Figure representing top places with their satisfaction and reliability scores.
+    """
+    labels = ranked["name"]
+    if ranked["market"].nunique() > 1:
+        labels = labels + " (" + ranked["market"].astype(str) + ")"
 
-    # Select top 30 places
-    top_places = df.head(30)
+    # Hover text is formatted client side from the per-bar values
+    customdata = np.column_stack([ranked["averageRating"], ranked["totalReviews"], ranked["satisfaction"],
+                                  ranked["reliability"]])
+    hover_prefix = "Rating: %{customdata[0]:.2~f} stars<br>Total Reviews: %{customdata[1]}<br>"
 
     # Create bar chart
     fig = go.Figure()
@@ -222,34 +229,26 @@ def top_performing_places(df):
     # Add Relative Satisfaction Score bars
     fig.add_trace(
         go.Bar(
-            x=top_places["name"],
-            y=top_places["Relative Satisfaction Score"],
+            x=labels,
+            y=ranked["relativeSatisfaction"],
             marker=dict(color="#2a9d8f"),
             name="Satisfaction Score",
-            text=top_places["Relative Satisfaction Score"].round(2).astype(str) + " %",
-            hovertext=(
-                    "Rating: " + top_places["averageRating"].astype(str) + " stars<br>" +
-                    "Total Reviews: " + top_places["totalReviews"].astype(str) + "<br>" +
-                    "Satisfaction Score: " + top_places["Satisfaction Score"].round(4).astype(str)
-            ),
-            hoverinfo="text"
+            texttemplate="%{y:.2f} %",
+            customdata=customdata,
+            hovertemplate=hover_prefix + "Satisfaction Score: %{customdata[2]:.4f}",
         )
     )
 
     # Add Reliability Score line
     fig.add_trace(
         go.Scatter(
-            x=top_places["name"],
-            y=top_places["Reliability Score"],
+            x=labels,
+            y=ranked["reliability"],
             marker=dict(color="#e9c46a"),
             name="Reliability Score",
-            text=top_places["Reliability Score"].round(2).astype(str),
-            hovertext=(
-                    "Rating: " + top_places["averageRating"].astype(str) + " stars<br>" +
-                    "Total Reviews: " + top_places["totalReviews"].astype(str) + "<br>" +
-                    "Reliability Score: " + top_places["Reliability Score"].round(4).astype(str)
-            ),
-            hoverinfo="text",
+            texttemplate="%{y:.2f}",
+            customdata=customdata,
+            hovertemplate=hover_prefix + "Reliability Score: %{customdata[3]:.4f}",
         )
     )
 
@@ -270,52 +269,104 @@ def top_performing_places(df):
     return fig
 
 
-def spatial_dist_of_business_points(df):
+CHARTS = {chart.__name__: chart for chart in (average_rating_overtime, average_rating_wrt_month_year,
+                                                rating_breakdown_pie, sentiment_score_overtime, top_performing_places)}
+
+
+@st.cache_data(max_entries=200)
+def cached_figure(chart: str, fingerprint: str, params: tuple, _df) -> dict:
+    """
+    Serialized figure of a chart, cached by (chart, fingerprint of its data, parameters).
+
+    :param chart: name of a figure factory of CHARTS
+    :param fingerprint: fingerprint of _df
+    :param params: further arguments of the figure factory
+    :param _df: The input DataFrame of the chart (not hashed).
+    :return: figure dict with typed arrays (compact_figure)
+    """
+    return compact_figure(CHARTS[chart](_df, *params))
+
+
+def chart_figure(chart, df: pd.DataFrame, *params, columns=None) -> SerializedFigure:
+    """
+    :param chart: figure factory of CHARTS
+    :param df: The input DataFrame of the chart
+    :param params: further arguments of the figure factory
+    :param columns: columns of df the chart reads, all by default
+    :return: cached figure to pass to st.plotly_chart
+    """
+    return SerializedFigure(cached_figure(chart.__name__, frame_fingerprint(df, columns), params, df))
+
+
+@st.cache_data(max_entries=100)
+def cached_grid_cells(_df, fingerprint: str, precision: int) -> pd.DataFrame:
+    """
+    Grid aggregation of a dataset, cached by the dataset's fingerprint.
+
+    :param _df: The input DataFrame containing places data (not hashed).
+    :param fingerprint: fingerprint of the aggregated columns of _df
+    :param precision: geohash precision of the grid
+    :return: DataFrame of aggregated grid cells
+    """
+    return grid_cells(_df, precision)
+
+
+def business_clusters_map(df) -> folium.Map:
+    """
+    Builds a clustered marker map of business points from the columns of the DataFrame.
+    Markers are created client side by FastMarkerCluster from one array of rows; below
+    GRID_MAX_ZOOM the points are replaced by aggregated geohash grid cells.
+
+    :param df: The input DataFrame containing places data.
+    :return: Folium map
+    """
     # Create a base map centered around the average latitude and longitude
     map_center = [df['latitude'].mean(), df['longitude'].mean()]
     m = folium.Map(location=map_center, zoom_start=12)
 
-    # Create a MarkerCluster object
-    marker_cluster = MarkerCluster().add_to(m)
+    popup_text = ("<strong>" + df['name'].astype(str) + "</strong><br>Rating: " + df['averageRating'].astype(str) +
+                  "<br>Reviews: " + df['totalReviews'].astype(str))
+    rows = [list(row) for row in zip(df['latitude'].astype(float), df['longitude'].astype(float), popup_text)]
+    points = FastMarkerCluster(rows, callback=CLUSTER_MARKER_CALLBACK).add_to(m)
 
-    # Add markers to the cluster
-    for i, row in df.iterrows():
-        popup_text = f"<strong>{row['name']}</strong><br>Rating: {row['averageRating']}<br>Reviews: {row['totalReviews']}"
-        folium.Marker(
-            location=[row['latitude'], row['longitude']],
-            popup=popup_text
-        ).add_to(marker_cluster)
+    # Zoomed out, aggregated grid cells are drawn instead of every point
+    GridCellsLayer(cached_grid_cells(df, frame_fingerprint(df, GRID_COLUMNS), GRID_PRECISION), points,
+                   max_zoom=GRID_MAX_ZOOM).add_to(m)
 
-    m.fit_bounds(m.get_bounds())
-    folium_static(m, width=600, height=500)
+    m.fit_bounds(places_bounds(df))
+    return m
 
 
-def folium_marker_map(df):
+def spatial_dist_of_business_points(df):
+    folium_static(business_clusters_map(df), width=600, height=500)
+
+
+def rating_circles_map(df) -> folium.Map:
+    """
+    Builds a map with a circle per place, sized by total reviews and coloured by rating,
+    drawn client side from one payload with template popups.
+
+    :param df: The input DataFrame containing places data.
+    :return: Folium map
+    """
     # Create a map centered around the average latitude and longitude
     map_center = [df['latitude'].mean(), df['longitude'].mean()]
     m = folium.Map(location=map_center, zoom_start=10, control_scale=True, prefer_canvas=True)
 
-    # Add circle markers to the map
-    for i, row in df.iterrows():
-        iframe = folium.IFrame(POPUP.format(
-            "",
-            str(row["name"]),
-            str(row["address"]),
-            str(row["averageRating"]),
-            str(row["totalReviews"]),
-            row["contact"]
-        ), width=320, height=180)
-        popup = folium.Popup(iframe, min_width=150, max_width=300)
-
-        folium.CircleMarker(
-            location=[row['latitude'], row['longitude']],
-            radius=row['totalReviews'] / 50,
-            color=None,
-            fill=True,
-            fill_color='blue' if row['averageRating'] >= 4 else 'yellow' if row['averageRating'] >= 3 else 'red',
-            fill_opacity=0.6,
-            popup=popup
-        ).add_to(m)
-
-    m.fit_bounds(m.get_bounds())
-    folium_static(m, width=600, height=500)
\ No newline at end of file
+    # Circle colour and radius per place, sent as the payload's colour and radius fields
+    rating = df['averageRating']
+    circles = df.assign(
+        markerColor=np.select([rating >= 4, rating >= 3], ['blue', 'yellow'], default='red'),
+        photo_url="",
+        radius=df['totalReviews'] / 50,
+    )
+    circles_layer = PlacesLayer(circles=True)
+    circles_layer.append(circles, PLACE_FIELDS + ['radius'])
+    circles_layer.add_to(m)
+
+    m.fit_bounds(places_bounds(df))
+    return m
+
+
+def folium_marker_map(df):
+    folium_static(rating_circles_map(df), width=600, height=500)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+# Listing columns the ranking reads
+RANKING_COLUMNS = ["name", "averageRating", "totalReviews"]
+# Places ranked, and the review count quantile a place needs to be ranked at all
+TOP_K = 30
+REVIEWS_QUANTILE = 0.40
+
+
+def market_scores(places: pd.DataFrame, market: str = "") -> pd.DataFrame:
+    """
+    Per-place scores of one market that don't depend on the other places ranked; branches
+    sharing a name are one place.
+
+    :param places: listings DataFrame with name, averageRating and totalReviews columns
+    :param market: label of the market, e.g. its city
+    :return: DataFrame of name, market, averageRating, totalReviews, weightedRating (rating x reviews)
+    and reliability (rating x log(1 + reviews))
+    """
+    places = places.dropna(subset=["averageRating"])
+    grouped = places.groupby("name", sort=False, observed=True).agg(
+        averageRating=("averageRating", "mean"), totalReviews=("totalReviews", "sum"))
+    rating = grouped["averageRating"].to_numpy(dtype=np.float64)
+    reviews = grouped["totalReviews"].to_numpy(dtype=np.int64)
+    return pd.DataFrame({
+        "name": grouped.index.astype(str).to_numpy(),
+        "market": pd.Categorical([market] * len(grouped)),
+        "averageRating": rating,
+        "totalReviews": reviews,
+        "weightedRating": rating * reviews,
+        "reliability": rating * np.log1p(reviews),
+    })
+
+
+def rank_places(scores, k: int = TOP_K) -> pd.DataFrame:
+    """
+    Ranks the places of one or more markets by their share of the ratings given to all ranked places.
+    Places with fewer reviews than the REVIEWS_QUANTILE of their pool aren't ranked.
+
+    :param scores: market_scores DataFrame, or a list of them to rank their markets together
+    :param k: number of places to return
+    :return: the market_scores rows of the top k places, best first, with their satisfaction
+    score and relativeSatisfaction (percent of the best one)
+    """
+    if isinstance(scores, list):
+        scores = pd.concat(scores, ignore_index=True) if scores else market_scores(pd.DataFrame(columns=RANKING_COLUMNS))
+    if len(scores) == 0:
+        return scores.assign(satisfaction=[], relativeSatisfaction=[])
+
+    reviews = scores["totalReviews"].to_numpy()
+    ranked = np.flatnonzero(reviews >= np.quantile(reviews, REVIEWS_QUANTILE))
+    satisfaction = scores["weightedRating"].to_numpy()[ranked] / reviews[ranked].sum()
+
+    # Only the top k are sorted
+    top = np.argpartition(-satisfaction, k - 1)[:k] if len(ranked) > k else np.arange(len(ranked))
+    top = top[np.argsort(-satisfaction[top], kind="stable")]
+    return scores.iloc[ranked[top]].reset_index(drop=True).assign(
+        satisfaction=satisfaction[top], relativeSatisfaction=satisfaction[top] / satisfaction.max() * 100)
@@ -0,0 +1,145 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+# Sustained Places API request rate per API key, and the burst allowed on top of it
+PLACES_QPS = float(os.environ.get("PLACES_QPS", 10))
+PLACES_BURST = int(os.environ.get("PLACES_BURST", 20))
+
+# Exponential backoff of retried requests: base delay, cap and number of attempts
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 8.0
+MAX_RETRIES = 6
+
+# Initial wait before a new next_page_token is first used; adapted to how soon tokens turn valid
+PAGE_TOKEN_DELAY = 1.5
+PAGE_TOKEN_MIN_DELAY = 0.2
+# Seconds after which an unused page token is forgotten
+PAGE_TOKEN_TTL = 60
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at ``rate`` tokens per second up to ``capacity``.
+    ``reserve`` takes a token right away and returns how long the caller has to wait for it,
+    so the same bucket can pace blocking threads and asyncio tasks alike.
+    """
+
+    def __init__(self, rate: float = PLACES_QPS, capacity: int = PLACES_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        :return: seconds to wait before making the request the token was taken for
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            # Tokens can go negative: later callers queue up behind earlier reservations
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class PageTokenPacer:
+    """
+    Thread-safe record of when every ``next_page_token`` was received, and of the wait learned
+    before a new one turns valid: shortened while tokens are valid on the first poll, otherwise
+    set to how long the last token took.
+    """
+
+    def __init__(self, delay: float = PAGE_TOKEN_DELAY, min_delay: float = PAGE_TOKEN_MIN_DELAY,
+                 ttl: float = PAGE_TOKEN_TTL):
+        self.delay = delay
+        self.min_delay = min_delay
+        self.ttl = ttl
+        # monotonic time every token of the last ``ttl`` seconds was received at, oldest first
+        self.tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wait(self, page_token: str = None) -> float:
+        """
+        :param page_token: page token about to be used, if any
+        :return: seconds to wait before using it
+        """
+        with self._lock:
+            received_at = self.tokens.get(page_token) if page_token is not None else None
+            if received_at is None:
+                return 0.0
+            return max(0.0, received_at + self.delay - time.monotonic())
+
+    def track(self, next_page_token: str = None, page_token: str = None, valid: bool = False, attempts: int = 0):
+        """
+        :param next_page_token: page token received, if any
+        :param page_token: page token the request used, if any
+        :param valid: the request succeeded
+        :param attempts: number of retries the request took
+        """
+        now = time.monotonic()
+        with self._lock:
+            if next_page_token:
+                # Tokens are kept in the order they were received, so the expired ones come first
+                while self.tokens and next(iter(self.tokens.values())) < now - self.ttl:
+                    self.tokens.popitem(last=False)
+                self.tokens[next_page_token] = now
+            received_at = self.tokens.pop(page_token, None)
+            if received_at is None or not valid:
+                return
+            if attempts == 0:
+                # Valid on the first poll: try a little earlier next time
+                self.delay = max(self.min_delay, self.delay * 0.8)
+            else:
+                self.delay = now - received_at
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """
+    Exponential backoff with full jitter.
+
+    :param attempt: number of the retry, from 0
+    :param base: delay of the first retry
+    :param cap: maximum delay
+    :return: seconds to wait before the retry
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+@lru_cache(maxsize=None)
+def get_rate_limiter(api_key: str) -> TokenBucket:
+    """
+    Returns the process-wide token bucket of an API key, shared by every Places client using it.
+
+    :param api_key: Google Maps API key
+    :return: shared TokenBucket
+    """
+    return TokenBucket()
+
+
+@lru_cache(maxsize=None)
+def get_page_token_pacer(api_key: str) -> PageTokenPacer:
+    """
+    Returns the process-wide page token pacer of an API key, so the wait learned by one search
+    carries over to the next ones.
+
+    :param api_key: Google Maps API key
+    :return: shared PageTokenPacer
+    """
+    return PageTokenPacer()
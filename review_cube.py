@@ -0,0 +1,167 @@
+import hashlib
+import re
+from collections import Counter
+from functools import lru_cache
+
+import pandas as pd
+
+# Words of the wordcloud, as WordCloud.process_text splits them
+WORD_PATTERN = re.compile(r"\w[\w']*")
+
+
+@lru_cache(maxsize=None)
+def stopwords() -> frozenset:
+    # wordcloud is only needed once the Reviews Analytics tab is opened
+    from wordcloud import STOPWORDS
+    return frozenset(word.lower() for word in STOPWORDS)
+
+
+def review_terms(text: str) -> list:
+    """
+    :param text: review text
+    :return: lowercase words of the text without stopwords, numbers and "'s" endings
+    """
+    words = (word[:-2] if word.lower().endswith("'s") else word for word in WORD_PATTERN.findall(text))
+    excluded = stopwords()
+    return [word for word in map(str.lower, words) if word and not word.isdigit() and word not in excluded]
+
+
+def row_key(reviews: pd.DataFrame, position: int) -> tuple:
+    """
+    :return: (place_id, datetime, reviewer) of the review at a position
+    """
+    row = reviews.iloc[position]
+    return str(row['place_id']), row['datetime'], str(row['reviewer'])
+
+
+class ReviewCube:
+    """
+    Per-place review rollups built in one pass over the reviews of a dataset: review counts by
+    (place, year, month, rating), the first/last review time and reviewers, and the term frequencies
+    of the review text of every place. The quarterly, monthly, rating histogram, KPI and wordcloud
+    views of a place are derived from them.
+    Reviews are append-only, so new rows are merged in with ``update`` instead of rebuilding.
+    """
+
+    def __init__(self):
+        # Number of review rows merged so far, and the last one, to recognise the frame they came from
+        self.rows = 0
+        self.last_row = None
+        self.counts = pd.Series(dtype="int64")
+        self.first = {}
+        self.last = {}
+        self.reviewers = {}
+        self.terms = {}
+        self._views = {}
+
+    def update(self, reviews: pd.DataFrame):
+        """
+        Merges new review rows into the rollups.
+
+        :param reviews: reviews DataFrame with place_id, datetime, rating, reviewer and text columns
+        :return: self
+        """
+        if len(reviews) == 0:
+            return self
+
+        place_ids = reviews['place_id'].astype(int).to_numpy()
+        datetimes = reviews['datetime']
+        keys = pd.DataFrame({'place_id': place_ids, 'year': datetimes.dt.year.to_numpy(),
+                             'month': datetimes.dt.month.to_numpy(), 'rating': reviews['rating'].astype(float).to_numpy()})
+        counts = keys.value_counts()
+        if len(self.counts) != 0:
+            counts = self.counts.add(counts, fill_value=0).astype("int64")
+        self.counts = counts.sort_index()
+
+        per_place = pd.DataFrame({'place_id': place_ids, 'datetime': datetimes.to_numpy(),
+                                  'reviewer': reviews['reviewer'].astype(str).to_numpy()}).groupby('place_id').agg(
+            first=('datetime', 'min'), last=('datetime', 'max'), reviewers=('reviewer', lambda names: set(names)))
+        for place_id, first, last, reviewers in per_place.itertuples():
+            place_id = int(place_id)
+            self.first[place_id] = min(first, self.first.get(place_id, first))
+            self.last[place_id] = max(last, self.last.get(place_id, last))
+            self.reviewers.setdefault(place_id, set()).update(reviewers)
+
+        for place_id, text in zip(place_ids.tolist(), reviews['text'].astype(str)):
+            self.terms.setdefault(place_id, Counter()).update(review_terms(text))
+
+        self.rows += len(reviews)
+        self.last_row = row_key(reviews, len(reviews) - 1)
+        self._views.clear()
+        return self
+
+    def _place_counts(self, place_id: int) -> pd.DataFrame:
+        """
+        :return: DataFrame of year, month, rating and count of the reviews of a place
+        """
+        if place_id not in self.first:
+            return pd.DataFrame({'year': [], 'month': [], 'rating': [], 'count': []})
+        return self.counts.loc[place_id].rename('count').reset_index()
+
+    def _view(self, name: str, place_id: int, build):
+        key = (name, place_id)
+        if key not in self._views:
+            self._views[key] = build(self._place_counts(place_id))
+        return self._views[key]
+
+    @staticmethod
+    def _mean_rating(counts: pd.DataFrame, by: list) -> pd.DataFrame:
+        totals = counts.assign(total=counts['rating'] * counts['count']).groupby(by)[['total', 'count']].sum()
+        return (totals['total'] / totals['count']).rename('rating').reset_index()
+
+    def quarterly(self, place_id: int) -> pd.DataFrame:
+        """
+        :return: DataFrame of year, quarter and average rating of a place
+        """
+        return self._view('quarterly', place_id, lambda counts: self._mean_rating(
+            counts.assign(quarter=(counts['month'] - 1) // 3 + 1), ['year', 'quarter']))
+
+    def monthly(self, place_id: int) -> pd.DataFrame:
+        """
+        :return: DataFrame of year, month_num, month_year ("Jan 2024") and average rating of a place
+        """
+        def build(counts):
+            monthly = self._mean_rating(counts.rename(columns={'month': 'month_num'}), ['year', 'month_num'])
+            month_start = pd.to_datetime(pd.DataFrame({'year': monthly['year'], 'month': monthly['month_num'], 'day': 1}))
+            return monthly.assign(month_year=month_start.dt.strftime("%b %Y"))
+        return self._view('monthly', place_id, build)
+
+    def rating_histogram(self, place_id: int) -> pd.DataFrame:
+        """
+        :return: DataFrame of rating and review count of a place
+        """
+        return self._view('histogram', place_id,
+                          lambda counts: counts.groupby('rating')['count'].sum().reset_index())
+
+    def kpis(self, place_id: int) -> dict:
+        """
+        :return: first and last review time, number of reviews and of unique reviewers of a place
+        """
+        return {'first': self.first.get(place_id), 'last': self.last.get(place_id),
+                'reviews': int(self._place_counts(place_id)['count'].sum()),
+                'reviewers': len(self.reviewers.get(place_id, ()))}
+
+    def term_frequencies(self, place_id: int):
+        """
+        :return: (term -> count in the reviews of a place, fingerprint of those counts)
+        """
+        key = ('terms', place_id)
+        if key not in self._views:
+            terms = self.terms.get(place_id, Counter())
+            digest = hashlib.blake2b(repr(sorted(terms.items())).encode(), digest_size=16).hexdigest()
+            self._views[key] = terms, digest
+        return self._views[key]
+
+
+def updated_review_cube(cube, reviews: pd.DataFrame) -> ReviewCube:
+    """
+    Brings a cube up to date with a reviews frame that only grew by appending rows since the cube
+    was built (a review sync or a List View refetch); otherwise (or without a cube) a new one is built.
+
+    :param cube: ReviewCube built from an earlier version of reviews, or None
+    :param reviews: reviews DataFrame
+    :return: up-to-date ReviewCube
+    """
+    if cube is None or cube.rows > len(reviews) or (cube.rows and row_key(reviews, cube.rows - 1) != cube.last_row):
+        return ReviewCube().update(reviews)
+    return cube.update(reviews.iloc[cube.rows:])
@@ -0,0 +1,204 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Reviews are compared as sets of SHINGLE_SIZE-byte shingles of their normalised text, of which
+# 1 in 2 ** SHINGLE_SAMPLE_BITS is hashed. A sparser sample leaves too few shingles of a short review
+# to estimate its similarity
+SHINGLE_SIZE = 5
+SHINGLE_SAMPLE_BITS = 1
+# Texts shorter than this (e.g. "Great place!") are too common to tell copies apart and are never flagged
+MIN_TEXT_LENGTH = 40
+# MinHash signature length, split into BANDS bands for locality-sensitive hashing
+NUM_PERM = 32
+BANDS = 8
+# Estimated Jaccard similarity from which a review counts as a copy of an earlier one. One edited word
+# changes about a fifth of the shingles of a 100-character review, which puts it near 0.8
+SIMILARITY_THRESHOLD = 0.7
+# Reviews hashed per batch and earlier reviews a SignatureIndex holds at most (~200 bytes each)
+TEXT_BATCH = 10_000
+INDEX_CAPACITY = int(os.environ.get("REVIEW_INDEX_CAPACITY", 250_000))
+
+_rng = np.random.default_rng(20240101)
+# Fixed seed: signatures are comparable across processes
+PERM_A = _rng.integers(1, 2 ** 32, NUM_PERM, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+PERM_B = _rng.integers(0, 2 ** 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+BAND_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_PERM // BANDS, dtype=np.uint64) | np.uint64(1)
+SHINGLE_BASE = np.uint32(16777619)
+SAMPLE_MULTIPLIER = np.uint32(2654435761)
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+
+def _batch_signatures(encoded: list) -> tuple:
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    signatures = np.full((len(encoded), NUM_PERM), np.iinfo(np.uint32).max, dtype=np.uint32)
+    valid = np.zeros(len(encoded), dtype=bool)
+    shingles_per_text = np.where(lengths >= MIN_TEXT_LENGTH, lengths - SHINGLE_SIZE + 1, 0)
+    if shingles_per_text.sum() == 0:
+        return signatures, valid
+
+    # Polynomial hash of the shingle starting at every byte of the joined texts
+    text_bytes = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+    positions = len(text_bytes) - SHINGLE_SIZE + 1
+    shingle_hashes = np.zeros(positions, dtype=np.uint32)
+    for offset in range(SHINGLE_SIZE):
+        shingle_hashes = shingle_hashes * SHINGLE_BASE + text_bytes[offset:offset + positions]
+
+    # Shingles within a text only, by text
+    group_starts = np.cumsum(shingles_per_text) - shingles_per_text
+    text_starts = np.cumsum(lengths) - lengths
+    shingle_hashes = shingle_hashes[np.arange(shingles_per_text.sum())
+                                    - np.repeat(group_starts - text_starts, shingles_per_text)]
+    shingle_texts = np.repeat(np.arange(len(encoded)), shingles_per_text)
+
+    # The same sample of shingles is kept in every text, which keeps their Jaccard similarity
+    sampled = (shingle_hashes * SAMPLE_MULTIPLIER) >> np.uint32(32 - SHINGLE_SAMPLE_BITS) == 0
+    shingle_hashes, shingle_texts = shingle_hashes[sampled], shingle_texts[sampled]
+    if len(shingle_texts) == 0:
+        return signatures, valid
+    group_starts = np.flatnonzero(np.concatenate([[True], shingle_texts[1:] != shingle_texts[:-1]]))
+    hashed = shingle_texts[group_starts]
+    valid[hashed] = True
+
+    for i in range(NUM_PERM):
+        permuted = shingle_hashes * PERM_A[i] + PERM_B[i]
+        permuted ^= permuted >> np.uint32(15)
+        signatures[hashed, i] = np.minimum.reduceat(permuted, group_starts)
+    return signatures, valid
+
+
+def minhash_signatures(texts) -> tuple:
+    """
+    :param texts: iterable of review texts
+    :return: (uint32 array of one MinHash signature per text, mask of the texts long enough to compare)
+    """
+    encoded = [normalize_text(str(text)).encode("utf-8") for text in texts]
+    batches = [_batch_signatures(encoded[i:i + TEXT_BATCH]) for i in range(0, len(encoded), TEXT_BATCH)]
+    if not batches:
+        return np.empty((0, NUM_PERM), dtype=np.uint32), np.empty(0, dtype=bool)
+    return np.concatenate([signatures for signatures, _ in batches]), np.concatenate([valid for _, valid in batches])
+
+
+def band_keys(signatures: np.ndarray) -> np.ndarray:
+    """
+    :return: uint64 LSH bucket key of every band of every signature
+    """
+    bands = signatures.reshape(len(signatures), BANDS, NUM_PERM // BANDS).astype(np.uint64)
+    return (bands * BAND_MULTIPLIERS).sum(axis=2, dtype=np.uint64)
+
+
+class SignatureIndex:
+    """
+    LSH index of the MinHash signatures of the leading reviews of a reviews frame. Only reviews
+    sharing a band bucket are compared, so matching is sub-quadratic; beyond ``capacity`` the oldest
+    reviews are dropped, which bounds its memory.
+    """
+
+    def __init__(self, capacity: int = INDEX_CAPACITY):
+        self.capacity = capacity
+        self.reset()
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def reset(self, rows: int = 0):
+        """
+        Empties the index, as if it covered the first ``rows`` reviews.
+        """
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32)
+        self.keys = np.empty((0, BANDS), dtype=np.uint64)
+        # Reviews of the frame covered, comparable or not, and the text of the last one
+        self.rows = rows
+        self.last_text = None
+
+    def covers(self, texts: np.ndarray, rows: int) -> bool:
+        """
+        :return: whether the index covers exactly the first ``rows`` of texts
+        """
+        return self.rows == rows and (rows == 0 or texts[rows - 1] == self.last_text)
+
+    def match(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        :param signatures: signatures of new comparable reviews, oldest first
+        :return: mask of the new reviews similar to an indexed review or to an earlier new one
+        """
+        indexed, keys = len(self), band_keys(signatures)
+        matched = np.zeros(len(signatures), dtype=bool)
+        for band in range(BANDS):
+            all_keys = np.concatenate([self.keys[:, band], keys[:, band]])
+            # Within a bucket rows keep their order, so a new review is compared with the one before it
+            order = np.argsort(all_keys, kind="stable")
+            same_bucket = np.flatnonzero(all_keys[order[1:]] == all_keys[order[:-1]])
+            previous, current = order[same_bucket], order[same_bucket + 1]
+            new = current >= indexed
+            previous, current = previous[new], current[new] - indexed
+            if len(current) == 0:
+                continue
+            previous_signatures = signatures[np.maximum(previous - indexed, 0)]
+            if indexed:
+                from_index = previous < indexed
+                previous_signatures[from_index] = self.signatures[previous[from_index]]
+            similarity = (previous_signatures == signatures[current]).mean(axis=1)
+            matched[current[similarity >= SIMILARITY_THRESHOLD]] = True
+        return matched
+
+    def extend(self, texts: np.ndarray, match: bool = True) -> np.ndarray:
+        """
+        Adds the reviews following the ones covered.
+
+        :param texts: review texts, oldest first
+        :param match: compare them with the earlier reviews
+        :return: mask of the reviews that are near copies of an earlier one
+        """
+        duplicate = np.zeros(len(texts), dtype=bool)
+        if len(texts) == 0:
+            return duplicate
+        signatures, valid = minhash_signatures(texts)
+        signatures = signatures[valid]
+        if match:
+            duplicate[valid] = self.match(signatures)
+        self.signatures = np.concatenate([self.signatures, signatures])[-self.capacity:]
+        self.keys = np.concatenate([self.keys, band_keys(signatures)])[-self.capacity:]
+        self.rows += len(texts)
+        self.last_text = texts[-1]
+        return duplicate
+
+
+def flag_duplicates(reviews: pd.DataFrame, index: SignatureIndex = None) -> pd.DataFrame:
+    """
+    Review quality stage: sets the 'duplicate' column of the reviews not flagged yet to whether their
+    text is a near copy of an earlier review of the frame, of the same or another place. Reviews are
+    append-only, so flagged rows keep their flag; passing the index kept from the previous call
+    saves hashing them again.
+
+    :param reviews: reviews DataFrame with a text column
+    :param index: SignatureIndex of the frame, updated in place
+    :return: reviews with a complete boolean 'duplicate' column
+    """
+    if len(reviews) == 0:
+        return reviews if "duplicate" in reviews.columns else reviews.assign(duplicate=pd.Series(dtype=bool))
+    flagged = reviews["duplicate"].notna().to_numpy() if "duplicate" in reviews.columns \
+        else np.zeros(len(reviews), dtype=bool)
+    # Flags are kept up to the first review without one
+    kept = len(reviews) if flagged.all() else int(np.argmin(flagged))
+
+    if kept == len(reviews):
+        return reviews if reviews["duplicate"].dtype == bool else reviews.assign(duplicate=reviews["duplicate"].astype(bool))
+
+    texts = reviews["text"].astype(str).to_numpy()
+    index = index if index is not None else SignatureIndex()
+    if not index.covers(texts, kept):
+        start = max(kept - index.capacity, 0)
+        index.reset(rows=start)
+        index.extend(texts[start:kept], match=False)
+
+    duplicate = np.zeros(len(reviews), dtype=bool)
+    if kept:
+        duplicate[:kept] = reviews["duplicate"].to_numpy()[:kept].astype(bool)
+    duplicate[kept:] = index.extend(texts[kept:])
+    return reviews.assign(duplicate=duplicate)
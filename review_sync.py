@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import DatasetStore, get_dataset_store
+from http_client import POOL_SIZE, get_places_client
+from review_quality import flag_duplicates
+from utils import concat_frames, extract_place_reviews
+
+# Fields requested when syncing; the newest reviews are asked for
+SYNC_FIELDS = "reviews"
+# Places synced less than this many seconds ago are skipped
+SYNC_INTERVAL = int(os.environ.get("REVIEW_SYNC_INTERVAL", 6 * 60 * 60))
+
+
+@dataclass
+class SyncResult:
+    places_checked: int = 0
+    places_skipped: int = 0
+    places_failed: int = 0
+    new_reviews: int = 0
+    elapsed: float = 0.0
+
+
+def review_fingerprints(reviews: pd.DataFrame) -> np.ndarray:
+    """
+    :param reviews: reviews DataFrame with datetime and reviewer columns
+    :return: uint64 fingerprint of the (time, author name) of every review
+    """
+    return pd.util.hash_pandas_object(reviews[["datetime", "reviewer"]].astype({"reviewer": str}),
+                                      index=False).to_numpy()
+
+
+def new_place_reviews(place, details_data: dict, known: np.ndarray, reviews_count: int) -> pd.DataFrame:
+    """
+    Builds the rows of the reviews of a place not held yet.
+
+    :param place: listing row with id and name
+    :param details_data: Place Details response with the place's newest reviews
+    :param known: fingerprints of the reviews held
+    :param reviews_count: number of reviews of the place held, to number the new ones after
+    :return: reviews DataFrame of the new reviews only
+    """
+    reviews = extract_place_reviews({"id": str(int(place.id)), "name": place.name}, details_data)
+    if len(reviews) == 0:
+        return reviews
+
+    reviews = reviews[~np.isin(review_fingerprints(reviews), known)].reset_index(drop=True)
+    serial = [str(reviews_count + j + 1) for j in range(len(reviews))]
+    return reviews.assign(id=serial, serial_Number=serial)
+
+
+def sync_reviews(api_key: str, business_place: str, country: str, city: str, store: DatasetStore = None,
+                 interval: float = SYNC_INTERVAL, force: bool = False):
+    """
+    Fetches the newest reviews of every place of a stored dataset and appends the ones not held yet.
+    Every place keeps a watermark with when it was last synced and its latest review time;
+    places synced within ``interval`` seconds are skipped unless ``force`` is set.
+
+    :param api_key: Google Maps API key
+    :param business_place: type of business
+    :param country: name of country
+    :param city: name of city
+    :param store: dataset store holding the dataset
+    :param interval: minimum seconds between two syncs of a place
+    :param force: sync every place
+    :return: (all reviews DataFrame, SyncResult), or (None, SyncResult) if the dataset isn't stored
+    """
+    start = time.perf_counter()
+    store = store or get_dataset_store()
+    result = SyncResult()
+
+    places = store.load_places(business_place, country, city, columns=["id", "place_id", "name"])
+    if places is None or len(places) == 0:
+        return None, result
+    reviews = store.load_reviews(business_place, country, city)
+    watermarks = store.load_watermarks(business_place, country, city)
+
+    now = time.time()
+    due = [place for place in places.itertuples(index=False)
+           if force or now - watermarks.get(place.place_id, {}).get("synced_at", 0) >= interval]
+    result.places_skipped = len(places) - len(due)
+
+    known = review_fingerprints(reviews) if len(reviews) != 0 else np.array([], dtype=np.uint64)
+    counts = reviews["place_id"].astype(int).value_counts().to_dict() if len(reviews) != 0 else {}
+
+    client = get_places_client(api_key)
+
+    def fetch(place):
+        try:
+            return client.place_details(place.place_id, SYNC_FIELDS, reviews_sort="newest", refresh=True)
+        except Exception as e:
+            # One failing place doesn't stop the sync; it is retried on the next one
+            return {"status": "ERROR", "error_message": str(e)}
+
+    new_batches = []
+    with ThreadPoolExecutor(max_workers=POOL_SIZE) as executor:
+        for place, details_data in zip(due, executor.map(fetch, due)):
+            if details_data.get("status") != "OK":
+                result.places_failed += 1
+                continue
+            result.places_checked += 1
+            new_reviews = new_place_reviews(place, details_data, known, counts.get(int(place.id), 0))
+            new_batches.append(new_reviews)
+
+            times = [review.get("time", 0) for review in details_data["result"].get("reviews", [])]
+            watermark = watermarks.setdefault(place.place_id, {})
+            watermark["synced_at"] = now
+            watermark["latest_review"] = max([watermark.get("latest_review", 0)] + times)
+
+    new_reviews = concat_frames(new_batches)
+    result.new_reviews = len(new_reviews)
+    if len(new_reviews) != 0:
+        # Append-only: rows held already are kept as they are
+        reviews = store.save_reviews(business_place, country, city,
+                                     flag_duplicates(concat_frames([reviews, new_reviews])))
+    store.save_watermarks(business_place, country, city, watermarks)
+
+    result.elapsed = time.perf_counter() - start
+    return reviews, result
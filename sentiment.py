@@ -0,0 +1,133 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# Number of new texts from which scoring is spread over worker processes
+PROCESS_POOL_THRESHOLD = 500
+BATCH_SIZE = 200
+# Worker processes scoring texts at most
+PROCESS_POOL_WORKERS = min(4, os.cpu_count() or 1)
+# Maximum number of memoized text scores
+MEMO_SIZE = 200_000
+# NLTK data the review text pipeline expects to be installed
+REQUIRED_CORPORA = {"punkt": "tokenizers/punkt"}
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def rating_scores(ratings: pd.Series) -> pd.Series:
+    """
+    Maps star ratings to sentiment scores, used when the review text can't be scored:
+    5 -> 1, 4 -> 0.5, 3 -> 0, 2 -> -0.5, 1 -> -1, anything else -> NaN.
+
+    :param ratings: series of review ratings
+    :return: series of scores aligned to ratings
+    """
+    scores = (ratings - 3) / 2
+    return scores.where(ratings.isin([1, 2, 3, 4, 5]))
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def polarities(texts: list) -> list:
+    """
+    Scores a batch of English texts with TextBlob.
+
+    :param texts: list of review texts
+    :return: polarity of each text
+    """
+    # TextBlob pulls in NLTK; only load it once there is text to score
+    from textblob import TextBlob
+
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+@lru_cache(maxsize=None)
+def missing_corpora() -> tuple:
+    """
+    Checks, without downloading anything, which required NLTK corpora are not installed.
+
+    :return: names of the missing corpora
+    """
+    import nltk
+
+    missing = []
+    for name, resource in REQUIRED_CORPORA.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    return tuple(missing)
+
+
+@lru_cache(maxsize=None)
+def get_process_pool() -> ProcessPoolExecutor:
+    # Workers are spawned: forking the multithreaded server can deadlock on locks held by other
+    # threads, and would copy its memory into every worker
+    pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+def score_texts(texts: list) -> list:
+    """
+    Scores English texts, reusing memoized scores of texts seen before.
+    Large batches of new texts are scored in worker processes.
+
+    :param texts: list of review texts
+    :return: polarity of each text
+    """
+    keys = [text_key(text) for text in texts]
+
+    with _memo_lock:
+        new_texts = {}
+        for key, text in zip(keys, texts):
+            if key in _memo:
+                _memo.move_to_end(key)
+            else:
+                new_texts[key] = text
+
+    if new_texts:
+        new_keys, batch = list(new_texts), list(new_texts.values())
+        if len(batch) >= PROCESS_POOL_THRESHOLD:
+            chunks = [batch[i:i + BATCH_SIZE] for i in range(0, len(batch), BATCH_SIZE)]
+            scores = [score for chunk in get_process_pool().map(polarities, chunks) for score in chunk]
+        else:
+            scores = polarities(batch)
+
+        with _memo_lock:
+            _memo.update(zip(new_keys, scores))
+            while len(_memo) > MEMO_SIZE:
+                _memo.popitem(last=False)
+
+    with _memo_lock:
+        # Fall back to scoring inline if an entry was evicted in between
+        return [_memo[key] if key in _memo else polarities([text])[0] for key, text in zip(keys, texts)]
+
+
+def sentiment_scores(df: pd.DataFrame) -> pd.Series:
+    """
+    Calculates the sentiment score of every review.
+    English reviews with text are scored from their text, the rest from their rating.
+
+    :param df: dataframe containing text, language and rating of reviews
+    :return: series of sentiment scores aligned to df
+    """
+    scores = rating_scores(df["rating"]).astype(float)
+
+    english = (df["language"] == "en") & (df["text"].str.len() != 0)
+    if english.any():
+        scores[english] = np.asarray(score_texts(df.loc[english, "text"].tolist()), dtype=float)
+
+    return scores
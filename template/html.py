@@ -1,3 +1,5 @@
+import html
+
 # ----------------------- CUSTOMIZED HTML COMPONENTS ------------------------------
 
 POPUP = """
@@ -88,4 +90,8 @@ def review_card(name, date, stars):
                 </button>
             </div>
         </div>
-        """
\ No newline at end of file
+        """
+
+
+def prefetch_links(urls):
+    return "".join(f'<link rel="prefetch" href="{html.escape(url, quote=True)}">' for url in urls)
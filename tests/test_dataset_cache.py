@@ -0,0 +1,65 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dataset_cache import DatasetCache, dataset_key, frame_nbytes  # noqa: E402
+
+
+def frame(n):
+    return pd.DataFrame({"id": range(n), "name": [f"Place {i}" for i in range(n)]})
+
+
+def test_dataset_key_hashes_api_key():
+    key = dataset_key("Cafés", "Lahore,+Pakistan", "secret-key")
+    assert key[:2] == ("Cafés", "Lahore,+Pakistan")
+    assert "secret-key" not in key[2]
+    assert key == dataset_key("Cafés", "Lahore,+Pakistan", "secret-key")
+    assert key != dataset_key("Cafés", "Lahore,+Pakistan", "other-key")
+
+
+def test_sessions_get_the_cached_frames():
+    cache = DatasetCache()
+    places, reviews = frame(10), frame(3)
+    cache.put(("Cafés", "Lahore", "k"), places, reviews)
+
+    dataset = cache.get(("Cafés", "Lahore", "k"))
+    assert dataset.places is places and dataset.reviews is reviews
+    assert cache.stats() == {"entries": 1, "nbytes": frame_nbytes(places) + frame_nbytes(reviews),
+                             "max_bytes": cache.max_bytes}
+
+
+def test_least_recently_used_datasets_are_evicted():
+    size = frame_nbytes(frame(100))
+    cache = DatasetCache(max_bytes=2 * size)
+    cache.put("a", frame(100), pd.DataFrame())
+    cache.put("b", frame(100), pd.DataFrame())
+    cache.get("a")
+    cache.put("c", frame(100), pd.DataFrame())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.nbytes == 2 * size
+
+    # The newest dataset is kept even if it alone exceeds the budget
+    cache.put("d", frame(1000), pd.DataFrame())
+    assert len(cache) == 1 and cache.get("d") is not None
+
+
+def test_replacing_a_dataset_updates_the_footprint():
+    cache = DatasetCache()
+    cache.put("a", frame(100), pd.DataFrame())
+    cache.put("a", frame(10), pd.DataFrame())
+    assert len(cache) == 1 and cache.nbytes == frame_nbytes(frame(10))
+
+
+def test_expired_datasets_are_missing():
+    cache = DatasetCache(ttl=60)
+    dataset = cache.put("a", frame(10), pd.DataFrame())
+    object.__setattr__(dataset, "loaded_at", datetime.now() - timedelta(seconds=61))
+
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.nbytes == 0
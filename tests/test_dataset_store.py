@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_store  # noqa: E402
+from dataset_store import DatasetStore  # noqa: E402
+
+
+def synthetic_places(n, name="Place"):
+    return pd.DataFrame({
+        "id": [str(i + 1) for i in range(n)], "name": [f"{name} {i}" for i in range(n)],
+        "city": "Lahore,+Pakistan", "markerColor": "blue", "latitude": 31.5, "longitude": 74.3,
+        "averageRating": 4.5, "totalReviews": range(n), "photo_url": 0,
+    })
+
+
+def test_save_load_compact_dtypes(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    reviews = pd.DataFrame({"place_id": ["1"], "rating": [5.0], "language": ["en"], "text": ["Great coffee"]})
+    store.save("Cafés", "Pakistan", "Lahore", synthetic_places(3), reviews)
+
+    places, stored_reviews = store.load("Cafés", "Pakistan", "Lahore")
+    assert store.keys() == [("Cafés", "Pakistan", "Lahore")]
+    assert places["latitude"].dtype == "float32" and places["totalReviews"].dtype == "int32"
+    assert places["city"].dtype == "category" and stored_reviews["language"].dtype == "category"
+    assert places["photo_url"].tolist() == ["0"] * 3
+    # Column projection, skipping columns the file doesn't have
+    assert store.load_places("Cafés", "Pakistan", "Lahore", ["name", "missing"]).columns.tolist() == ["name"]
+
+
+def test_concurrent_writes_to_one_partition(tmp_path, monkeypatch):
+    store = DatasetStore(str(tmp_path))
+    write_table = pq.write_table
+
+    def slow_write_table(*args, **kwargs):
+        # Widens the window in which writers would share a temp file
+        write_table(*args, **kwargs)
+        time.sleep(0.05)
+
+    monkeypatch.setattr(dataset_store.pq, "write_table", slow_write_table)
+    start, errors = threading.Barrier(6), []
+
+    def save(writer):
+        start.wait()
+        try:
+            store.save("Cafés", "Pakistan", "Lahore", synthetic_places(writer + 1, f"Writer {writer}"), pd.DataFrame())
+            store.save_watermarks("Cafés", "Pakistan", "Lahore", {"writer": writer})
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save, args=(writer,)) for writer in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    places = store.load_places("Cafés", "Pakistan", "Lahore")
+    # One writer's complete file
+    writer = int(places["name"][0].split()[1])
+    assert places["name"].tolist() == [f"Writer {writer} {i}" for i in range(writer + 1)]
+    assert "writer" in store.load_watermarks("Cafés", "Pakistan", "Lahore")
+    partition = store.partition_path("Cafés", "Pakistan", "Lahore")
+    assert not [name for name in os.listdir(partition) if name.endswith(".tmp")]
@@ -0,0 +1,126 @@
+import os
+import sys
+import threading
+
+import folium
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_cache  # noqa: E402
+from dataset_store import DatasetStore  # noqa: E402
+from http_client import PlacesApiError  # noqa: E402
+from map_layers import PLACE_FIELDS, PlacesLayer  # noqa: E402
+
+LOADER_KEY = "Lahore,+Pakistan-Cafés-loader"
+
+
+def map_app():
+    import streamlit as st
+    from views.views import map_view
+
+    st.session_state["loaded"] = map_view("Cafés", "Pakistan", "Lahore", "test-key") is not None
+
+
+def synthetic_places(n, start=0):
+    return pd.DataFrame({
+        "id": [str(start + i + 1) for i in range(n)], "place_id": [f"p{start + i}" for i in range(n)],
+        "latitude": 31.5 + 0.01 * (start + pd.RangeIndex(n)), "longitude": 74.3, "markerColor": "blue",
+        "photo_url": None, "name": [f"Place {start + i}" for i in range(n)], "address": "Lahore",
+        "averageRating": 4.5, "totalReviews": 10, "contact": "",
+    })
+
+
+def use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(dataset_cache, "get_dataset_store", lambda: DatasetStore(str(tmp_path)))
+    monkeypatch.setattr(dataset_cache, "get_dataset_cache", lambda: dataset_cache.DatasetCache())
+
+
+def run_until_loaded(app):
+    """
+    Runs the app, and once more after the background fetch if the first run didn't see it finish.
+    """
+    app.run()
+    if LOADER_KEY in app.session_state:
+        app.session_state[LOADER_KEY].future.exception(timeout=10)
+        app.run()
+    return app
+
+
+def test_map_view_zero_results(tmp_path, monkeypatch):
+    use_store(monkeypatch, tmp_path)
+    # A ZERO_RESULTS search yields no batches at all
+    monkeypatch.setattr(dataset_cache, "get_places_data", lambda *args, **kwargs: iter(()))
+
+    app = run_until_loaded(AppTest.from_function(map_app))
+
+    assert not app.exception
+    assert [info.value for info in app.info] == ["No places found for this selection."]
+    assert app.session_state["loaded"]
+    assert app.session_state["Lahore,+Pakistan-Cafés-data"].empty
+    # Nothing found is not stored
+    assert not os.listdir(tmp_path)
+
+
+def test_map_view_loads_in_background(tmp_path, monkeypatch):
+    use_store(monkeypatch, tmp_path)
+    second_page = threading.Event()
+
+    def get_places_data(*args, **kwargs):
+        yield synthetic_places(3), pd.DataFrame()
+        second_page.wait(10)
+        yield synthetic_places(2, start=3), pd.DataFrame()
+
+    monkeypatch.setattr(dataset_cache, "get_places_data", get_places_data)
+
+    app = AppTest.from_function(map_app).run()
+    # The script does not wait for the fetch
+    assert not app.exception
+    assert not app.session_state["loaded"]
+    assert "Lahore,+Pakistan-Cafés-data" not in app.session_state
+    assert app.caption[0].value.startswith("Loading...")
+
+    second_page.set()
+    app.session_state[LOADER_KEY].future.exception(timeout=10)
+    app.run()
+
+    assert not app.exception
+    assert app.session_state["loaded"]
+    assert app.session_state["Lahore,+Pakistan-Cafés-data"]["place_id"].tolist() == [f"p{i}" for i in range(5)]
+    assert LOADER_KEY not in app.session_state
+
+
+def test_places_layer_sends_rows_from_offset():
+    places_map = folium.Map()
+    feature_group = folium.FeatureGroup().add_to(places_map)
+    layer = PlacesLayer(icon="coffee", offset=3)
+    layer.append(synthetic_places(2, start=3)[PLACE_FIELDS])
+    layer.add_to(feature_group)
+    html = places_map.get_root().render()
+
+    assert [row[4] for row in layer.rows] == ["Place 3", "Place 4"]
+    # Markers go to the layer kept on the map, skipping the rows it already has
+    assert f"var map = {places_map.get_name()};" in html
+    assert ".slice(Math.max((layer.count || 0) - 3, 0));" in html
+    assert "layer.count = Math.max(layer.count || 0, 5);" in html
+
+
+def test_map_view_api_error(tmp_path, monkeypatch):
+    use_store(monkeypatch, tmp_path)
+
+    def get_places_data(*args, **kwargs):
+        yield synthetic_places(3), pd.DataFrame()
+        raise PlacesApiError("OVER_QUERY_LIMIT")
+
+    monkeypatch.setattr(dataset_cache, "get_places_data", get_places_data)
+
+    app = run_until_loaded(AppTest.from_function(map_app))
+
+    assert not app.exception
+    assert app.error[0].value == "Places API request failed (OVER_QUERY_LIMIT). Please try again later."
+    assert "Lahore,+Pakistan-Cafés-data" not in app.session_state
+    # Partial results are neither stored nor kept: the next run fetches the dataset again
+    assert not os.listdir(tmp_path)
+    app.run()
+    assert LOADER_KEY in app.session_state
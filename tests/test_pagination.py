@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils  # noqa: E402
+from rate_limit import PAGE_TOKEN_DELAY, get_page_token_pacer  # noqa: E402
+
+PAGES = 3
+PAGE_SIZE = 5
+TOKEN_DELAY = 0.3
+
+
+class MockPlacesApi:
+    """
+    Places API whose next_page_tokens only turn valid TOKEN_DELAY seconds after they are issued
+    (INVALID_REQUEST before that), answering the first request of every search with OVER_QUERY_LIMIT.
+    """
+
+    def __init__(self):
+        self.tokens = {}
+        self.statuses = []
+        self.details_in_flight = 0
+        self.max_details_in_flight = 0
+        self.app = web.Application()
+        self.app.router.add_get("/textsearch/json", self.text_search)
+        self.app.router.add_get("/details/json", self.details)
+
+    async def text_search(self, request):
+        token = request.query.get("pagetoken")
+        if not self.statuses or self.statuses[-1] == "END":
+            status = "OVER_QUERY_LIMIT"
+        elif token is not None and time.monotonic() < self.tokens[token][1]:
+            status = "INVALID_REQUEST"
+        else:
+            status = "OK"
+        self.statuses.append(status)
+        if status != "OK":
+            return web.json_response({"status": status, "results": []})
+
+        page = self.tokens[token][0] if token is not None else 0
+        body = {"status": "OK", "results": [
+            {"place_id": f"p{page * PAGE_SIZE + i}", "name": f"Place {page * PAGE_SIZE + i}",
+             "geometry": {"location": {"lat": 31.5, "lng": 74.3}}}
+            for i in range(PAGE_SIZE)
+        ]}
+        if page + 1 < PAGES:
+            body["next_page_token"] = f"token-{len(self.tokens)}"
+            self.tokens[body["next_page_token"]] = (page + 1, time.monotonic() + TOKEN_DELAY)
+        else:
+            self.statuses.append("END")
+        return web.json_response(body)
+
+    async def details(self, request):
+        self.details_in_flight += 1
+        self.max_details_in_flight = max(self.max_details_in_flight, self.details_in_flight)
+        await asyncio.sleep(0.05)
+        self.details_in_flight -= 1
+        return web.json_response({"status": "OK", "result": {"rating": 4.5, "user_ratings_total": 10}})
+
+
+def test_pagination_against_mock_server(monkeypatch):
+    import http_client
+
+    api_key = "test-pagination"
+    monkeypatch.setattr(utils, "get_details_cache", lambda: None)
+
+    async def run_search(api):
+        async with TestServer(api.app) as server:
+            monkeypatch.setattr(http_client, "PLACES_API_URL", str(server.make_url("")).rstrip("/"))
+            batches = utils.iter_places_async(api_key, "cafes", "Lahore,+Pakistan", n=PAGES * PAGE_SIZE)
+            return [place_info async for batch in batches for place_info, _ in batch]
+
+    try:
+        api = MockPlacesApi()
+        places = asyncio.run(run_search(api))
+
+        # Quota errors and early page tokens are retried instead of truncating the results
+        assert sorted(place["place_id"] for place in places) == sorted(f"p{i}" for i in range(PAGES * PAGE_SIZE))
+        assert "OVER_QUERY_LIMIT" in api.statuses and api.statuses.count("OK") == PAGES
+        # The details of a page are fetched concurrently
+        assert api.max_details_in_flight > 1
+
+        # The wait learned for page tokens carries over to the next search with the same API key
+        pacer = get_page_token_pacer(api_key)
+        learned_delay = pacer.delay
+        assert learned_delay < PAGE_TOKEN_DELAY
+        api = MockPlacesApi()
+        start = time.monotonic()
+        assert len(asyncio.run(run_search(api))) == PAGES * PAGE_SIZE
+        assert get_page_token_pacer(api_key) is pacer
+        assert time.monotonic() - start < (PAGES - 1) * PAGE_TOKEN_DELAY
+    finally:
+        get_page_token_pacer.cache_clear()
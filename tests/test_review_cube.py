@@ -0,0 +1,70 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from review_cube import ReviewCube, updated_review_cube  # noqa: E402
+
+
+def synthetic_reviews(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "place_id": rng.integers(1, 4, n).astype(str),
+        "datetime": pd.to_datetime(rng.integers(1.5e9, 1.7e9, n), unit="s"),
+        "rating": rng.integers(1, 6, n).astype(float),
+        "reviewer": [f"Reviewer {i}" for i in rng.integers(0, n // 2, n)],
+        "text": rng.choice(["Great coffee and cake", "Slow service", "Coffee was cold"], n),
+    })
+
+
+def test_views_match_the_raw_reviews():
+    reviews = synthetic_reviews(500)
+    cube = ReviewCube().update(reviews)
+    place = reviews[reviews["place_id"] == "2"]
+
+    quarterly = place.groupby([place["datetime"].dt.year.rename("year"),
+                               place["datetime"].dt.quarter.rename("quarter")])["rating"].mean()
+    assert np.allclose(cube.quarterly(2).set_index(["year", "quarter"])["rating"], quarterly)
+
+    monthly = place.groupby([place["datetime"].dt.year.rename("year"),
+                             place["datetime"].dt.month.rename("month_num")])["rating"].mean()
+    assert np.allclose(cube.monthly(2).set_index(["year", "month_num"])["rating"], monthly)
+    assert cube.monthly(2)["month_year"].iloc[0] == place["datetime"].min().strftime("%b %Y")
+
+    assert cube.rating_histogram(2).set_index("rating")["count"].to_dict() == place["rating"].value_counts().to_dict()
+    assert cube.kpis(2) == {"first": place["datetime"].min(), "last": place["datetime"].max(),
+                            "reviews": len(place), "reviewers": place["reviewer"].nunique()}
+
+    terms, _ = cube.term_frequencies(2)
+    assert terms["coffee"] == place["text"].str.contains("offee").sum()
+
+
+def test_appended_reviews_are_merged_incrementally():
+    reviews = synthetic_reviews(500)
+    cube = updated_review_cube(None, reviews.iloc[:300])
+    same_cube = updated_review_cube(cube, reviews)
+    full = ReviewCube().update(reviews)
+
+    assert same_cube is cube and cube.rows == 500
+    for place_id in (1, 2, 3):
+        pd.testing.assert_frame_equal(cube.quarterly(place_id), full.quarterly(place_id))
+        assert cube.kpis(place_id) == full.kpis(place_id)
+        assert cube.term_frequencies(place_id) == full.term_frequencies(place_id)
+
+
+def test_cube_is_rebuilt_for_another_frame():
+    cube = updated_review_cube(None, synthetic_reviews(300))
+    other = synthetic_reviews(400, seed=1)
+
+    rebuilt = updated_review_cube(cube, other)
+    assert rebuilt is not cube and rebuilt.rows == 400
+    assert updated_review_cube(rebuilt, other.iloc[:200]) is not rebuilt
+
+
+def test_place_without_reviews():
+    cube = ReviewCube().update(synthetic_reviews(50))
+    assert cube.kpis(99) == {"first": None, "last": None, "reviews": 0, "reviewers": 0}
+    assert cube.rating_histogram(99).empty
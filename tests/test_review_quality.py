@@ -0,0 +1,72 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from review_quality import MIN_TEXT_LENGTH, SignatureIndex, flag_duplicates  # noqa: E402
+
+VOCABULARY = ["great", "food", "service", "staff", "friendly", "coffee", "place", "nice", "good", "amazing",
+              "delicious", "slow", "cold", "price", "clean", "visit", "again", "recommend", "best", "cake",
+              "waiter", "table", "ordered", "pizza", "fresh", "taste", "lovely", "atmosphere", "music", "wait"]
+
+
+def synthetic_reviews(n, length, rng):
+    texts = []
+    for _ in range(n):
+        words = []
+        while len(" ".join(words)) < length:
+            words.append(rng.choice(VOCABULARY))
+        texts.append(" ".join(words).capitalize() + ".")
+    return texts
+
+
+def edit_one_word(text, rng):
+    words = text.rstrip(".").split()
+    i = rng.integers(len(words))
+    words[i] = rng.choice([word for word in VOCABULARY if word != words[i].lower()])
+    return " ".join(words) + "."
+
+
+def test_one_word_edit_of_a_short_review_is_flagged():
+    review = "The coffee was lovely and the staff really friendly, but we waited twenty minutes for a table."
+    reviews = pd.DataFrame({"text": [review, review.replace("lovely", "great")]})
+    assert len(review) < 100
+    assert flag_duplicates(reviews)["duplicate"].tolist() == [False, True]
+
+
+def test_one_word_edits_of_100_character_reviews_are_mostly_flagged():
+    rng = np.random.default_rng(0)
+    originals = synthetic_reviews(300, 100, rng)
+    copies = [edit_one_word(text, rng) for text in originals]
+    duplicate = flag_duplicates(pd.DataFrame({"text": originals + copies}))["duplicate"].to_numpy()
+    assert not duplicate[:300].any()
+    assert duplicate[300:].mean() >= 0.9
+
+
+def test_distinct_reviews_sharing_a_vocabulary_are_not_flagged():
+    rng = np.random.default_rng(1)
+    for length in (MIN_TEXT_LENGTH, 100, 200):
+        reviews = pd.DataFrame({"text": synthetic_reviews(1000, length, rng)})
+        assert flag_duplicates(reviews)["duplicate"].mean() <= 0.002
+
+
+def test_short_reviews_are_never_flagged():
+    reviews = pd.DataFrame({"text": ["Great place!", "Great place!", "great place", "Nice staff, good coffee."]})
+    assert not flag_duplicates(reviews)["duplicate"].any()
+
+
+def test_kept_index_flags_appended_reviews_like_a_full_pass():
+    rng = np.random.default_rng(2)
+    originals = synthetic_reviews(200, 120, rng)
+    texts = originals + [edit_one_word(text, rng) for text in originals[:50]] + synthetic_reviews(50, 120, rng)
+    index = SignatureIndex()
+    flagged = flag_duplicates(pd.DataFrame({"text": texts[:150]}), index)
+    appended = pd.concat([flagged, pd.DataFrame({"text": texts[150:]})], ignore_index=True)
+
+    incremental = flag_duplicates(appended, index)["duplicate"]
+    full = flag_duplicates(pd.DataFrame({"text": texts}))["duplicate"]
+    assert incremental.tolist() == full.tolist()
+    assert index.rows == len(texts)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import review_sync  # noqa: E402
+from dataset_store import DatasetStore  # noqa: E402
+from http_client import AsyncPlacesClient, PlacesClient  # noqa: E402
+from review_quality import flag_duplicates  # noqa: E402
+from utils import extract_place_reviews  # noqa: E402
+
+PLACES = pd.DataFrame({"id": [1, 2], "place_id": ["g1", "g2"], "name": ["Cafe A", "Cafe B"], "totalReviews": [2, 1]})
+
+
+def review(time, author, text="Nice place"):
+    return {"time": time, "author_name": author, "rating": 5, "text": text, "language": "en"}
+
+
+def details(*reviews):
+    return {"status": "OK", "result": {"reviews": list(reviews)}}
+
+
+class FakeClient:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def place_details(self, place_id, fields, reviews_sort=None, refresh=False):
+        self.calls.append((place_id, fields, reviews_sort, refresh))
+        return self.responses[place_id]
+
+
+def stored_dataset(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    first = details(review(1_600_000_000, "Ann"), review(1_600_000_100, "Bob"))
+    reviews = pd.concat([extract_place_reviews({"id": "1", "name": "Cafe A"}, first),
+                         extract_place_reviews({"id": "2", "name": "Cafe B"}, details(review(1_600_000_200, "Cid")))],
+                        ignore_index=True)
+    store.save("Cafés", "Pakistan", "Lahore", PLACES, flag_duplicates(reviews))
+    return store
+
+
+def test_sync_appends_only_new_reviews(tmp_path, monkeypatch):
+    store = stored_dataset(tmp_path)
+    client = FakeClient({
+        "g1": details(review(1_700_000_000, "Dee", "Brand new review"), review(1_600_000_100, "Bob")),
+        "g2": {"status": "OVER_QUERY_LIMIT"},
+    })
+    monkeypatch.setattr(review_sync, "get_places_client", lambda api_key: client)
+
+    reviews, result = review_sync.sync_reviews("key", "Cafés", "Pakistan", "Lahore", store=store)
+
+    assert (result.places_checked, result.places_failed, result.new_reviews) == (1, 1, 1)
+    assert set(call[2:] for call in client.calls) == {("newest", True)}
+    assert reviews["reviewer"].tolist() == ["Ann", "Bob", "Cid", "Dee"]
+    # Numbered after the reviews the place already has
+    assert reviews["serial_Number"].tolist()[-1] == "3"
+    assert store.load_reviews("Cafés", "Pakistan", "Lahore")["reviewer"].tolist()[-1] == "Dee"
+    watermarks = store.load_watermarks("Cafés", "Pakistan", "Lahore")
+    assert watermarks["g1"]["latest_review"] == 1_700_000_000 and "g2" not in watermarks
+
+    # g1 was synced just now and is skipped; the failed place is retried
+    client.calls.clear()
+    _, result = review_sync.sync_reviews("key", "Cafés", "Pakistan", "Lahore", store=store)
+    assert [call[0] for call in client.calls] == ["g2"]
+    assert (result.places_skipped, result.new_reviews) == (1, 0)
+
+
+def test_sync_of_a_dataset_not_stored(tmp_path):
+    store = DatasetStore(str(tmp_path))
+    reviews, result = review_sync.sync_reviews("key", "Cafés", "Pakistan", "Lahore", store=store)
+    assert reviews is None and result.places_checked == 0
+
+
+class DictCache(dict):
+    def get(self, place_id, fields):
+        return super().get((place_id, fields))
+
+    def put(self, place_id, fields, details_data):
+        self[place_id, fields] = details_data
+
+
+def test_details_by_review_order_are_cached_separately():
+    responses = []
+
+    def get_json(url, page_token=None):
+        responses.append(url)
+        return {"status": "OK", "result": {"n": len(responses)}}, 0
+
+    async def get_json_async(url, page_token=None):
+        return get_json(url, page_token)
+
+    for client, call in ((PlacesClient("key", cache=DictCache()), lambda result: result),
+                         (AsyncPlacesClient("key", cache=DictCache()), asyncio.run)):
+        client._get_json = get_json_async if isinstance(client, AsyncPlacesClient) else get_json
+        responses.clear()
+        assert call(client.place_details("g1", "reviews"))["result"]["n"] == 1
+        assert call(client.place_details("g1", "reviews", reviews_sort="newest"))["result"]["n"] == 2
+        assert responses[-1].endswith("&reviews_sort=newest")
+        # Both orders are served from the cache until a refresh
+        assert call(client.place_details("g1", "reviews"))["result"]["n"] == 1
+        assert call(client.place_details("g1", "reviews", reviews_sort="newest"))["result"]["n"] == 2
+        assert call(client.place_details("g1", "reviews", reviews_sort="newest", refresh=True))["result"]["n"] == 3
+        assert set(client.cache) == {("g1", "reviews"), ("g1", "reviews;newest")}
@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_cache  # noqa: E402
+from dataset_store import DatasetStore  # noqa: E402
+
+DATA_KEY = "Lahore,+Pakistan-Cafés-data"
+
+
+def session_app():
+    from data_handling import load_session_dataset
+
+    load_session_dataset("Cafés", "Pakistan", "Lahore", "test-key")
+
+
+def no_fetch(*args, **kwargs):
+    raise AssertionError("stored datasets must not be fetched again")
+
+
+def test_sessions_share_stored_dataset(tmp_path, monkeypatch):
+    store, cache = DatasetStore(str(tmp_path)), dataset_cache.DatasetCache()
+    monkeypatch.setattr(dataset_cache, "get_dataset_store", lambda: store)
+    monkeypatch.setattr(dataset_cache, "get_dataset_cache", lambda: cache)
+    monkeypatch.setattr(dataset_cache, "get_places_data", no_fetch)
+    places = pd.DataFrame({"id": ["1", "2"], "name": ["Cafe A", "Cafe B"], "totalReviews": [3, 5]})
+    reviews = pd.DataFrame({"place_id": ["1"], "text": ["Great coffee"], "duplicate": [False]})
+    store.save("Cafés", "Pakistan", "Lahore", places, reviews)
+    # Stored long before the cache TTL, e.g. by the crawler
+    os.utime(os.path.join(store.partition_path("Cafés", "Pakistan", "Lahore"), "places.parquet"), (0, 0))
+
+    first, second = AppTest.from_function(session_app).run(), AppTest.from_function(session_app).run()
+
+    assert not first.exception and not second.exception
+    assert first.session_state[DATA_KEY]["name"].tolist() == ["Cafe A", "Cafe B"]
+    # Both sessions hold the frames of the one cached dataset
+    assert first.session_state[DATA_KEY] is second.session_state[DATA_KEY]
+    assert len(cache) == 1
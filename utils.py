@@ -1,49 +1,26 @@
-import requests
+import aiohttp
+import asyncio
+import numpy as np
 import pandas as pd
+import requests
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor
-from geosky import geo_plug
-import json
-import time
-# from textblob_de import TextBlobDE
-# from textblob_fr import PatternAnalyzer
-from textblob import TextBlob
-import nltk
-
-nltk.download('punkt')
-
-
-def get_cities_names(location):
-    states_data = json.loads(geo_plug.all_Country_StateNames())
-
-    # Find states for the selected country
-    states = []
-    for entry in states_data:
-        if location in entry:
-            states = entry[location]
-            break
-
-    cities = set()
-    # st.write(states_data)
-    for state in states:
-        cities_data = json.loads(geo_plug.all_State_CityNames(state))
-        for entry in cities_data:
-            if state in entry:
-                cities.update(entry[state])
-                break
+from details_cache import get_details_cache
+from http_client import AsyncPlacesClient, PlacesApiError, get_places_client
+from rate_limit import get_page_token_pacer, get_rate_limiter
+from sentiment import sentiment_scores
 
-    return cities
 
-
-def fetch_place_details(api_key, result, location, i):
-    place_id = result['place_id']
-
-    # Place Details
-    details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=name,formatted_address,geometry,international_phone_number,rating,user_ratings_total,reviews&key={api_key}"
-    details_response = requests.get(details_url)
-    details_data = details_response.json()
-
-    # Extract place information
+def extract_place_info(client, result, details_data, location, i):
+    """
+    Builds the listing row of a place from its text-search result and Place Details response.
+
+    :param client: PlacesClient used to build the photo URL
+    :param result: text-search result of the place
+    :param details_data: Place Details response of the place
+    :param location: name of city and country
+    :param i: position of the place in the search results
+    :return: dict with listing info of the place
+    """
     place_info = {
         'address': result.get('formatted_address', ''),
         'averageRating': details_data['result'].get('rating', ''),
@@ -60,72 +37,211 @@ def fetch_place_details(api_key, result, location, i):
     # Extract the photo_reference and construct the photo URL
     photo_reference = result.get("photos", [{}])[0].get("photo_reference", "")
     if photo_reference:
-        photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=100&photoreference={photo_reference}&key={api_key}"
-        place_info['photo_url'] = photo_url
+        place_info['photo_url'] = client.photo_url(photo_reference)
     else:
         place_info['photo_url'] = None
 
     return place_info
 
 
-def get_places_data(api_key, business_place, location, n=20):
-    places_list = []
-    next_page_token = None
+def usable_details(result, details_data):
+    """
+    Falls back to the rating fields of the text-search result when Place Details failed,
+    so one bad response only costs that place its reviews.
+
+    :param result: text-search result of the place
+    :param details_data: Place Details response of the place, or None if the request failed
+    :return: a Place Details response with a 'result'
+    """
+    if details_data is not None and details_data.get('status') == 'OK':
+        return details_data
+    return {'status': (details_data or {}).get('status', 'ERROR'),
+            'result': {'rating': result.get('rating', ''), 'user_ratings_total': result.get('user_ratings_total', '')}}
+
 
-    while len(places_list) < n:
-        # Place Search with pagination support
-        search_url = f"https://maps.googleapis.com/maps/api/place/textsearch/json?query={business_place}+in+{location}&key={api_key}"
-        if next_page_token:
-            search_url += f"&pagetoken={next_page_token}"
+def fetch_place_details(api_key, result, location, i):
+    client = get_places_client(api_key)
 
-        search_response = requests.get(search_url)
-        search_data = search_response.json()
+    # Place Details
+    try:
+        details_data = client.place_details(result['place_id'])
+    except (requests.RequestException, ValueError):
+        details_data = None
+    details_data = usable_details(result, details_data)
 
-        if 'results' not in search_data:
-            break
+    # One details response gives both the listing row and the review rows
+    place_info = extract_place_info(client, result, details_data, location, i)
+    return place_info, extract_place_reviews(place_info, details_data)
 
-        with ThreadPoolExecutor(max_workers=10) as executor:
-            futures = [
-                executor.submit(fetch_place_details, api_key, result, location, len(places_list) + i)
+
+async def fetch_place_details_async(client, result, location, i):
+    try:
+        details_data = await client.place_details(result['place_id'])
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        details_data = None
+    details_data = usable_details(result, details_data)
+
+    place_info = extract_place_info(client, result, details_data, location, i)
+    return place_info, extract_place_reviews(place_info, details_data)
+
+
+async def iter_places_async(api_key, business_place, location, n=20):
+    """
+    Async generator of batches of (listing row, reviews) pairs; text-search pages and the
+    details fan-out of every page share one pooled client on the running event loop.
+
+    :param api_key: Google Maps API key
+    :param business_place: type of business
+    :param location: name of city and country
+    :param n: minimum number of places to fetch
+    :return: lists with the places whose details arrived since the previous batch
+    :raises PlacesApiError: if a search page still fails after its retries
+    """
+    fetched = 0
+    next_page_token = None
+
+    async with AsyncPlacesClient(api_key, cache=get_details_cache(), rate_limiter=get_rate_limiter(api_key),
+                                 page_token_pacer=get_page_token_pacer(api_key)) as client:
+        while fetched < n:
+            # Place Search with pagination support; the client waits until next_page_token is valid
+            search_data = await client.text_search(f"{business_place}+in+{location}", next_page_token)
+
+            if search_data.get('status') == 'ZERO_RESULTS':
+                break
+            if search_data.get('status') != 'OK':
+                # Retries are exhausted; fail instead of silently returning a truncated result
+                raise PlacesApiError(search_data.get('status', 'UNKNOWN_ERROR'),
+                                     search_data.get('error_message', ''))
+
+            pending = {
+                asyncio.ensure_future(fetch_place_details_async(client, result, location, fetched + i))
                 for i, result in enumerate(search_data['results'])
-            ]
+            }
+            fetched += len(pending)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    yield [task.result() for task in done]
+            finally:
+                for task in pending:
+                    task.cancel()
+
+            next_page_token = search_data.get('next_page_token', None)
+            if not next_page_token or fetched >= n:
+                break
+
+
+def concat_frames(frames) -> pd.DataFrame:
+    """
+    Concatenates DataFrames, skipping empty ones.
+
+    :param frames: iterable of DataFrames
+    :return: concatenated DataFrame, empty if every frame is empty
+    """
+    frames = [frame for frame in frames if len(frame) != 0]
+    if len(frames) == 0:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
 
-            for future in futures:
-                place_info = future.result()
-                places_list.append(place_info)
 
-                df_places_info = pd.DataFrame(places_list)
+def process_places_batch(batch, seen_place_ids: set):
+    """
+    Pre-processes a batch of newly fetched places, skipping places already seen.
 
-                df_places_info = pre_process_listings_data(df_places_info)
-                yield df_places_info
+    :param batch: list of (listing row, reviews DataFrame) pairs
+    :param seen_place_ids: Google place ids processed so far; updated in place
+    :return: (listings DataFrame, reviews DataFrame) of the new places only
+    """
+    batch = [(place_info, place_reviews) for place_info, place_reviews in batch
+             if place_info['place_id'] not in seen_place_ids]
+    seen_place_ids.update(place_info['place_id'] for place_info, _ in batch)
+    if len(batch) == 0:
+        return pd.DataFrame(), pd.DataFrame()
 
-        next_page_token = search_data.get('next_page_token', None)
-        if not next_page_token:
-            break
+    places = pre_process_listings_data(pd.DataFrame([place_info for place_info, _ in batch]))
+    reviews = concat_frames(place_reviews for _, place_reviews in batch)
+    return places, reviews
 
-        # To prevent hitting API rate limits
-        time.sleep(2)  # Delay for 2 seconds before making the next request
 
-        if len(places_list) >= n:
-            break
+class ListingsAccumulator:
+    """
+    Append-only accumulator of processed listings and reviews batches.
+    Batches are only concatenated when the full frames are requested.
+    """
 
-    # Convert lists to DataFrames
-    df_places = pd.DataFrame(places_list)
+    def __init__(self):
+        self.places_batches = []
+        self.reviews_batches = []
 
-    df_places = pre_process_listings_data(df_places)
+    def __len__(self):
+        return sum(len(places) for places in self.places_batches)
 
-    return df_places
+    def append(self, places: pd.DataFrame, reviews: pd.DataFrame):
+        self.places_batches.append(places)
+        self.reviews_batches.append(reviews)
 
+    def places_frame(self) -> pd.DataFrame:
+        """
+        :return: all listings, sorted by totalReviews like pre_process_listings_data output
+        """
+        places = concat_frames(self.places_batches)
+        if len(places) != 0:
+            places = places.sort_values(by='totalReviews', kind='stable').reset_index(drop=True)
+        return places
 
-def get_place_reviews(api_key, result):
-    place_id = result['place_id']
+    def reviews_frame(self) -> pd.DataFrame:
+        return concat_frames(self.reviews_batches)
 
-    # Place Details
-    details_url = f"https://maps.googleapis.com/maps/api/place/details/json?place_id={place_id}&fields=name,formatted_address,geometry,international_phone_number,rating,user_ratings_total,reviews&key={api_key}"
-    details_response = requests.get(details_url)
-    details_data = details_response.json()
 
-    # Extract reviews
+def get_places_data(api_key, business_place, location, n=20, incremental=True):
+    """
+    Fetches places of a business type in a location as a stream of batches.
+    Every place is processed once, when its details arrive.
+
+    :param api_key: Google Maps API key
+    :param business_place: type of business
+    :param location: name of city and country
+    :param n: minimum number of places to fetch
+    :param incremental: yield only the new rows of each batch; otherwise yield everything loaded so far
+    :return: (listings DataFrame, reviews DataFrame) pairs
+    """
+    accumulator = ListingsAccumulator()
+    seen_place_ids = set()
+
+    # Drive the async fetch pipeline from this (synchronous) generator on a dedicated event loop
+    loop = asyncio.new_event_loop()
+    batches = iter_places_async(api_key, business_place, location, n)
+    try:
+        while True:
+            try:
+                batch = loop.run_until_complete(batches.__anext__())
+            except StopAsyncIteration:
+                break
+
+            places, reviews = process_places_batch(batch, seen_place_ids)
+            if len(places) == 0:
+                continue
+            accumulator.append(places, reviews)
+
+            if incremental:
+                yield places, reviews
+            else:
+                yield accumulator.places_frame(), accumulator.reviews_frame()
+    finally:
+        loop.run_until_complete(batches.aclose())
+        loop.close()
+
+    return accumulator.places_frame(), accumulator.reviews_frame()
+
+
+def extract_place_reviews(result, details_data):
+    """
+    Builds the review rows of a place from its Place Details response.
+
+    :param result: listing row (or search result) of the place
+    :param details_data: Place Details response of the place
+    :return: pre-processed DataFrame of reviews, empty if the place has none
+    """
     reviews_list = []
     reviews = details_data['result'].get('reviews', [])
     for j, review in enumerate(reviews):
@@ -152,6 +268,21 @@ def get_place_reviews(api_key, result):
         return pd.DataFrame()
 
 
+def get_place_reviews(api_key, result):
+    # Place Details
+    details_data = get_places_client(api_key).place_details(result['place_id'])
+
+    return extract_place_reviews(result, details_data)
+
+
+# totalReviews buckets of the map marker colour, lower bounds inclusive
+MARKER_COLOR_BINS = [-np.inf, 25, 50, 100, np.inf]
+MARKER_COLORS = ["red", "lightgray", "orange", "green"]
+
+# totalReviews groups of the adjustedReview column, in ascending order
+REVIEW_GROUPS = ["Up-to 50", "50 to 100", "100-200", "More than 200"]
+
+
 def pre_process_listings_data(data: pd.DataFrame) -> pd.DataFrame:
     """
     Pre-processes place listings data.
@@ -163,32 +294,25 @@ def pre_process_listings_data(data: pd.DataFrame) -> pd.DataFrame:
     data.reset_index(inplace=True)
     data = adjust_column_datatypes(data)
     data.fillna(0, inplace=True)
-    data["markerColor"] = data["totalReviews"].apply(
-        lambda x: "green" if x >= 100 else ("orange" if x >= 50 else ("lightgray" if x >= 25 else "red")))
+    data["markerColor"] = pd.cut(data["totalReviews"], bins=MARKER_COLOR_BINS, labels=MARKER_COLORS, right=False)
     data["totalReviews"] = data["totalReviews"].astype(int)
-    data["adjustedReview"] = data["totalReviews"].apply(adjusted_reviews)
-    data["adjustedRating"] = data["averageRating"].apply(lambda x: int(x // 1))
+    data["adjustedReview"] = adjusted_reviews(data["totalReviews"])
+    data["adjustedRating"] = (data["averageRating"] // 1).astype(int)
     data.sort_values(by='totalReviews', inplace=True)
     data.reset_index(drop=True, inplace=True)
 
     return data
 
 
-def adjusted_reviews(review: int) -> str:
+def adjusted_reviews(reviews: pd.Series) -> pd.Categorical:
     """
     Categorizes the number of reviews into different groups based on provided values.
 
-    :param review: The total number of reviews.
-    :return: A string indicating the category of the number of reviews.
+    :param reviews: The total number of reviews of each place.
+    :return: An ordered categorical indicating the category of the number of reviews.
     """
-    if review >= 200:
-        return "More than 200"
-    elif 100 < review <= 200:
-        return "100-200"
-    elif 50 < review <= 100:
-        return "50 to 100"
-    else:
-        return "Up-to 50"
+    codes = np.select([reviews >= 200, reviews > 100, reviews > 50], [3, 2, 1], default=0)
+    return pd.Categorical.from_codes(codes, categories=REVIEW_GROUPS, ordered=True)
 
 
 def adjust_column_datatypes(df: pd.DataFrame) -> pd.DataFrame:
@@ -213,7 +337,7 @@ def adjust_column_datatypes(df: pd.DataFrame) -> pd.DataFrame:
             df[column] = pd.to_numeric(df[column], errors='coerce', downcast='float')
 
     df['createdAt'] = pd.to_datetime(df['createdAt'])
-    df["contact"] = df["contact"].apply(lambda x: ''.join(filter(str.isdigit, str(x))))
+    df["contact"] = df["contact"].astype(str).str.replace(r"\D", "", regex=True)
     return df
 
 
@@ -254,43 +378,6 @@ def adjust_column_datatypes_of_reviews(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def calculate_sentiment_score(row: pd.Series):
-    """
-    Function to calculate sentiment score of a review.
-    of ratings to corresponding integer representation
-    :param row: Series containing text and language of the review
-    :return: None
-   """
-    text = row['text']
-    lang = row['language']
-
-    # worst-case: text has no words or language other than English
-    if len(text) == 0 or lang not in ['en']:
-        rating = row['rating']
-        if rating == 5:
-            return 1
-        elif rating == 4:
-            return 0.5
-        elif rating == 3:
-            return 0
-        elif rating == 2:
-            return -0.5
-        elif rating == 1:
-            return -1
-    else:
-        return TextBlob(text).sentiment.polarity
-    # # calculating sentiment score based on language
-    # if lang in ['en', 'de', 'fr']:
-    #     if lang == 'en':
-    #         return TextBlob(text).sentiment.polarity
-    #     elif lang == 'de':
-    #         return TextBlobDE(text).sentiment.polarity
-    #     elif lang == 'fr':
-    #         return TextBlob(text, analyzer=PatternAnalyzer()).sentiment[0]
-
-    return None
-
-
 def insert_sentiment_scores(df):
     """
     Function to insert sentiment score column
@@ -299,28 +386,28 @@ def insert_sentiment_scores(df):
     :return: dataframe with added column representing sentiment scores.
     """
 
-    df['sentiment_score'] = df.apply(calculate_sentiment_score, axis=1)
+    df['sentiment_score'] = sentiment_scores(df)
 
     return df
 
 
-def calculate_kpis(place_data, place_reviews):
+def calculate_kpis(place_data, place_kpis):
     """
     Function to calculate KPI values
-    :param place_reviews: dataframe of reviews
+    :param place_kpis: review KPIs of the place from its ReviewCube
     :param place_data: dataframe containing info of the place
     :return: KPIs values
     """
 
     total_reviews = place_data['totalReviews'].iloc[0]
     average_ratings = place_data['averageRating'].iloc[0]
-    total_years = place_reviews['datetime'].dt.year.nunique()
 
-    earliest_date = place_reviews['datetime'].min()
-    latest_date = place_reviews['datetime'].max()
-    total_months = (latest_date.year - earliest_date.year) * 12 + (latest_date.month - earliest_date.month)
+    earliest_date = place_kpis['first']
+    latest_date = place_kpis['last']
+    # Reviews of a single month count as one month
+    total_months = max((latest_date.year - earliest_date.year) * 12 + (latest_date.month - earliest_date.month), 1)
     monthly_reviews_rate = (total_reviews / total_months)
 
-    unique_reviewers = place_reviews["reviewer"].nunique()
+    unique_reviewers = place_kpis['reviewers']
 
     return total_reviews, average_ratings, unique_reviewers, monthly_reviews_rate
@@ -7,4 +7,11 @@ def sidebar_country(countries_list):
     return st.sidebar.selectbox(label="Location", options=countries_list)
 
 def sidebar_city(cities_list):
-    return st.sidebar.selectbox(label="City", options=sorted(cities_list))
+    # cities_list is expected to be sorted already
+    return st.sidebar.selectbox(label="City", options=cities_list)
+
+def sidebar_stored_dataset(stored_data, reviews_loaded=False):
+    business_place = st.sidebar.selectbox(label="Business", options=stored_data.businesses(reviews_loaded))
+    country = sidebar_country(stored_data.countries(business_place, reviews_loaded))
+    city = sidebar_city(stored_data.cities(business_place, country, reviews_loaded))
+    return business_place, country, city
@@ -1,40 +1,52 @@
 from views.views import map_view, review_analytics_page, list_view, market_analysis_page
-from views.components import sidebar_business_place, sidebar_country, sidebar_city
-from data_handling import get_stored_data, update_data_store
-from utils import get_cities_names
+from views.components import sidebar_business_place, sidebar_country, sidebar_city, sidebar_stored_dataset
+from data_handling import get_stored_data, update_data_store, load_session_dataset, sync_session_reviews
+from dataset_cache import get_dataset_cache
+from location_index import get_country_names, get_cities_names
+from sentiment import missing_corpora
 import streamlit as st
 
 
-def places_map_tab(query_map, geo_plug, API_KEY):
+def places_map_tab(query_map, API_KEY):
     business_place = sidebar_business_place(query_map)
-    countries_list = geo_plug.all_CountryNames()
+    countries_list = get_country_names()
     country = sidebar_country(countries_list)
     cities_list = get_cities_names(country)
     city = sidebar_city(cities_list)
 
-    map_view(business_place, country, city, API_KEY)
-    update_data_store(city, country, business_place)
+    if map_view(business_place, country, city, API_KEY) is not None:
+        update_data_store(city, country, business_place)
+
+    cache_stats = get_dataset_cache().stats()
+    st.sidebar.caption(f"Shared datasets: {cache_stats['entries']} "
+                       f"({cache_stats['nbytes'] / 1024 ** 2:.1f} of {cache_stats['max_bytes'] / 1024 ** 2:.0f} MB)")
 
 
 def list_view_tab(API_KEY):
     stored_data = get_stored_data()
 
-    business_place = st.sidebar.selectbox(label="Business", options=list(stored_data['Business Point'].unique()))
-    country = sidebar_country(stored_data[stored_data['Business Point']==business_place]['Country'].unique())
-    city = sidebar_city(stored_data[(stored_data['Business Point'] == business_place) &
-                                    (stored_data['Country'] == country)]['City'].unique())
+    business_place, country, city = sidebar_stored_dataset(stored_data)
+    load_session_dataset(business_place, country, city, API_KEY)
+
+    if st.sidebar.button("Sync new reviews"):
+        with st.spinner("Syncing reviews..."):
+            result = sync_session_reviews(business_place, country, city, API_KEY)
+        st.sidebar.caption(f"{result.new_reviews} new reviews from {result.places_checked} places "
+                           f"({result.places_skipped} synced recently, {result.places_failed} failed)")
 
     list_view(business_place, country, city, API_KEY)
 
 
-def reviews_analytics_tab():
+def reviews_analytics_tab(API_KEY):
+    missing = missing_corpora()
+    if missing:
+        st.warning(f"NLTK data not installed: {', '.join(missing)}. "
+                   f"Install it with `python -m nltk.downloader {' '.join(missing)}`.")
+
     stored_data = get_stored_data()
-    stored_data = stored_data[stored_data['Reviews'] == 1]
-    if len(stored_data) != 0:
-        business_place = st.sidebar.selectbox(label="Business", options=list(stored_data['Business Point'].unique()))
-        country = sidebar_country(stored_data[stored_data['Business Point']==business_place]['Country'].unique())
-        city = sidebar_city(stored_data[(stored_data['Business Point'] == business_place) &
-                                        (stored_data['Country'] == country)]['City'].unique())
+    if len(stored_data.businesses(reviews_loaded=True)) != 0:
+        business_place, country, city = sidebar_stored_dataset(stored_data, reviews_loaded=True)
+        load_session_dataset(business_place, country, city, API_KEY)
 
         review_analytics_page(location=f'{city},+{country}', business_place=business_place)
     else:
@@ -44,11 +56,8 @@ def reviews_analytics_tab():
 def market_analysis_tab():
     stored_data = get_stored_data()
     if len(stored_data) != 0:
-        business_place = st.sidebar.selectbox(label="Business", options=list(stored_data['Business Point'].unique()))
-        country = sidebar_country(stored_data[stored_data['Business Point']==business_place]['Country'].unique())
-        city = sidebar_city(stored_data[(stored_data['Business Point'] == business_place) &
-                                        (stored_data['Country'] == country)]['City'].unique())
+        business_place, country, city = sidebar_stored_dataset(stored_data)
 
-        market_analysis_page(location=f'{city},+{country}', business_place=business_place)
+        market_analysis_page(business_place, country, city)
     else:
         st.info("Go to Home to load data first.")
@@ -1,82 +1,171 @@
 import folium
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
 import streamlit as st
-from streamlit_folium import folium_static
+from streamlit_folium import st_folium
 from plots import average_rating_overtime, rating_breakdown_pie, sentiment_score_overtime, reviews_wordcloud, \
-    average_rating_wrt_month_year, top_performing_places, folium_marker_map, spatial_dist_of_business_points
-from template.html import POPUP, review_card, card_view
+    average_rating_wrt_month_year, top_performing_places, folium_marker_map, spatial_dist_of_business_points, \
+    cached_market_scores, chart_figure, SENTIMENT_COLUMNS
+from data_handling import get_stored_data, mark_reviews_loaded, session_places, session_review_cube, session_reviews
+from dataset_cache import DatasetLoader, cached_dataset, frame_fingerprint
+from http_client import POOL_SIZE, PlacesApiError
+from map_layers import PLACE_FIELDS, PlacesLayer
+from ranking import RANKING_COLUMNS, rank_places
+from template.html import review_card, card_view, prefetch_links
 from template.constants import icons_map
-from utils import get_places_data, get_place_reviews, calculate_kpis
+from utils import calculate_kpis, concat_frames, get_place_reviews
+
+# Places shown per List View page
+LIST_PAGE_SIZE = 10
+# Concurrent review fetches of a List View page
+REVIEW_FETCH_WORKERS = POOL_SIZE
+# Seconds between refreshes of the map while the places of a dataset are being fetched
+MAP_REFRESH = 0.5
 
 
-@st.cache_data
 def map_view(business_place, country: str, city: str, API_KEY: str):
     """
-    Creates a Folium map with markers for places based on the provided DataFrame.
+    Shows a Folium map with markers for the places of a business type in a location.
+    Data comes from the shared dataset cache when possible; otherwise it is fetched in the background
+    and the map is refreshed with the places of every new batch, without drawing it again.
 
     :param city: name of city
     :param country: name of country
     :param business_place: type of business
     :param API_KEY: Google Maps API key
-    :return: The Folium map with place markers.
+    :return: the Dataset once it is loaded, None while it is being fetched
     """
 
     location = f"{city},+{country}"
+    loader_key = f'{location}-{business_place}-loader'
+    # (batches, places) of the fetch already on the map
+    sent_key = f'{location}-{business_place}-map-sent'
+
+    dataset = cached_dataset(business_place, country, city, API_KEY)
+    loader = st.session_state.get(loader_key)
+    if dataset is None and loader is None:
+        loader = st.session_state[loader_key] = DatasetLoader(business_place, country, city, API_KEY)
+    if dataset is not None or loader.done():
+        st.session_state.pop(loader_key, None)
+    if dataset is None and loader.done():
+        try:
+            dataset = loader.result()
+        except PlacesApiError as error:
+            # Partial results are not cached, so the next run fetches the dataset again
+            st.error(f"Places API request failed ({error}). Please try again later.")
+            st.stop()
+    # A full run may have remounted the map, so it gets every place again
+    st.session_state[sent_key] = (0, 0)
+
+    @st.fragment(run_every=MAP_REFRESH if dataset is None else None)
+    def places_map():
+        if dataset is None and loader.done():
+            # Fetched: a full rerun stores the dataset and stops the refreshes
+            st.rerun()
+        if dataset is not None:
+            places, offset = dataset.places, 0
+        else:
+            sent_batches, offset = st.session_state[sent_key]
+            batches = loader.places_batches[sent_batches:]
+            places = concat_frames(batches)
+            st.session_state[sent_key] = (sent_batches + len(batches), offset + len(places))
+            st.caption(f"Loading... {offset + len(places)} places so far")
+
+        # Markers are sent as one compact payload of the places the map doesn't have yet, in a feature group
+        # st_folium swaps on the map it already shows; popups are built in the browser when opened
+        places_layer = PlacesLayer(icon=icons_map.get(business_place), offset=offset)
+        places_layer.append(places)
+        feature_group = folium.FeatureGroup(name="places", control=False)
+        places_layer.add_to(feature_group)
+        places_map_base = folium.Map(location=[0, 0], zoom_start=10, control_scale=True, prefer_canvas=True)
+        st_folium(places_map_base, key=f'{location}-{business_place}-map', feature_group_to_add=feature_group,
+                  width=1200, height=600, returned_objects=[])
+
+    places_map()
+    if dataset is None:
+        return None
+    if dataset.places.empty:
+        st.info("No places found for this selection.")
+
+    # The session holds references to the shared frames
+    st.session_state[f'{location}-{business_place}-data'] = dataset.places
+    st.session_state[f'{location}-{business_place}-reviews'] = dataset.reviews
+    return dataset
+
+
+def reviews_for_places(reviews_data, places):
+    """
+    :param reviews_data: reviews DataFrame of a dataset
+    :param places: listings of some places of the dataset
+    :return: dict of listing id to the reviews DataFrame of each of the places that has reviews
+    """
+    if len(reviews_data) == 0 or len(places) == 0:
+        return {}
+    reviews_data = reviews_data[reviews_data['place_id'].astype(int).isin(places['id'].astype(int))]
+    return {int(place_id): reviews for place_id, reviews in reviews_data.groupby('place_id')}
 
-    # Initialize an empty DataFrame to hold the place data
-    place_data = pd.DataFrame()
-
-    # Placeholder for displaying the map
-    # map_placeholder = st.empty()
-    # Initialize the map
-    places_map = folium.Map(location=[0, 0], zoom_start=10, control_scale=True, prefer_canvas=True)
-
-    # Display the initial map
-    map_placeholder = folium_static(places_map, width=1000, height=600)
-
-    with st.spinner("Loading..."):
-        for partial_place_data in get_places_data(API_KEY, business_place, location=location):
-            # Append new data to the existing DataFrame
-            place_data = pd.concat([place_data, partial_place_data], ignore_index=True)
-
-            place_data.drop_duplicates(subset=['id'], inplace=True)
-
-            # Update the map with the new place data
-            for i, row in partial_place_data.iterrows():
-                iframe = folium.IFrame(POPUP.format(
-                    str(row['photo_url']),
-                    str(row["name"]),
-                    str(row["address"]),
-                    str(row["averageRating"]),
-                    str(row["totalReviews"]),
-                    row["contact"]
-                ), width=300, height=250)
-                popup = folium.Popup(iframe, min_width=150, max_width=300)
-
-                # Add each row to the existing map
-                folium.Marker(
-                    location=[row['latitude'], row['longitude']],
-                    tooltip=row["name"],
-                    icon=folium.Icon(color=row['markerColor'], icon=icons_map.get(business_place), prefix='fa'),
-                    popup=popup,
-                ).add_to(places_map)
-
-            places_map.fit_bounds(places_map.get_bounds())
 
-            # Update the map display with the new markers
-            map_placeholder.empty()  # Clear previous map
-            map_placeholder = folium_static(places_map, width=1200, height=600)
+def page_photo_urls(places, reviews_by_place):
+    """
+    :return: URLs of the place and reviewer photos shown on a page of places
+    """
+    if places.empty or 'photo_url' not in places:
+        return []
+    urls = places['photo_url'].astype(str).tolist()
+    for reviews in reviews_by_place.values():
+        urls.extend(reviews['photo_url'].astype(str))
+    return [url for url in urls if url.startswith("http")]
 
-    st.session_state[f'{location}-{business_place}-data'] = place_data
 
+def place_card(place, place_reviews, key, error=None, loading=False):
+    """
+    Renders the card of a place with its reviews on the right.
 
+    :param place: listing row
+    :param place_reviews: reviews DataFrame of the place
+    :param key: widget key of the reviews toggle
+    :param error: error of a failed reviews fetch, shown instead of the reviews
+    :param loading: reviews are still being fetched
+    """
+    upper_row = st.columns(2)
+    with upper_row[0]:
+        st.markdown(card_view(place["name"], place["address"], place['photo_url'],
+                                  f"{place['averageRating']:.1f}", place["totalReviews"],
+                                  place["contact"]),
+                        unsafe_allow_html=True)
+
+    with upper_row[1]:
+        if loading:
+            st.caption("Loading reviews...")
+        elif error is not None:
+            st.warning(f"Reviews could not be loaded: {error}")
+        # place Reviews, built only while they are shown
+        elif st.toggle(f"Reviews ({len(place_reviews)})", key=key):
+            for _, review in place_reviews.iterrows():
+                row_ = st.columns((1, 6))
+                # reviewer image on left
+                row_[0].image(review['photo_url'])
+                # review detail on right
+                row_[1].markdown(review_card(review['reviewer'], review['date'],
+                                             review['rating']),
+                                 unsafe_allow_html=True)
+                # review text on bottom
+                if review["text"] != "nan":
+                    st.write(f"{review['text']}")
+                st.write("---")
+
+    st.write("---")
 
 
-@st.cache_data
 def list_view(business_place, country, city, API_KEY: str):
     """
     Function to create a view to list places.
     Data view in list with place detail on left and its reviews on right.
+    Only one page of places is built; the reviews of a place are rendered once they are opened,
+    and the photos of the next page are prefetched by the browser.
+    Places of the page whose reviews are missing (their details failed while loading) are fetched
+    concurrently, and each card is filled in as its reviews arrive.
 
     :param city: name of city
     :param country: name of country
@@ -86,46 +175,58 @@ def list_view(business_place, country, city, API_KEY: str):
     """
     location=f'{city},+{country}'
     place_data = st.session_state[f'{location}-{business_place}-data']
-    reviews_data = pd.DataFrame()
-
-    for _, place in place_data.iterrows():
-        upper_row = st.columns(2)
-        with upper_row[0]:
-            st.markdown(card_view(place["name"], place["address"], place['photo_url'],
-                                      f"{place['averageRating']:.1f}", place["totalReviews"],
-                                      place["contact"]),
-                            unsafe_allow_html=True)
-
-        place_reviews = get_place_reviews(api_key=API_KEY, result=place)
-        reviews_data = pd.concat([reviews_data, place_reviews])
-        with upper_row[1]:
-            # place Reviews Tab
-            review_bar = st.expander(label=f"Reviews ({len(place_reviews)})")
-            with review_bar:
-                # Update the map with the new place data
-                for _, review in place_reviews.iterrows():
-                    row_ = st.columns((1, 6))
-                    # reviewer image on left
-                    row_[0].image(review['photo_url'])
-                    # review detail on right
-                    row_[1].markdown(review_card(review['reviewer'], review['date'],
-                                                 review['rating']),
-                                     unsafe_allow_html=True)
-                    # review text on bottom
-                    if review["text"] != "nan":
-                        st.write(f"{review['text']}")
-                    st.write("---")
-
-        st.write("---")
-
-    st.session_state['data_store'].loc[
-        (st.session_state['data_store']["City"] == city) &
-        (st.session_state['data_store']["Country"] == country) &
-        (st.session_state['data_store']["Business Point"] == business_place),
-        "Reviews"
-    ] = 1
-
-    st.session_state[f'{location}-{business_place}-reviews'] = reviews_data
+    # Reviews were loaded with the places in map view
+    reviews_data = st.session_state[f'{location}-{business_place}-reviews']
+    # Places whose reviews were fetched again in this session, successfully or not
+    refetched = st.session_state.setdefault(f'{location}-{business_place}-refetched', set())
+
+    pages = max(1, math.ceil(len(place_data) / LIST_PAGE_SIZE))
+    page = st.sidebar.number_input("Page", min_value=1, max_value=pages, value=1, step=1,
+                                   key=f'{location}-{business_place}-page')
+    st.sidebar.caption(f"{len(place_data)} places, page {page} of {pages}")
+
+    start = (page - 1) * LIST_PAGE_SIZE
+    page_places = place_data.iloc[start:start + LIST_PAGE_SIZE]
+    reviews_by_place = reviews_for_places(reviews_data, page_places)
+
+    missing = {}
+    for _, place in page_places.iterrows():
+        place_id = int(place['id'])
+        toggle_key = f"{location}-{business_place}-{place_id}"
+        if place_id not in reviews_by_place and place['totalReviews'] > 0 and place_id not in refetched:
+            missing[place_id] = (place, st.empty())
+            with missing[place_id][1].container():
+                place_card(place, None, toggle_key, loading=True)
+        else:
+            place_card(place, reviews_by_place.get(place_id, pd.DataFrame()), toggle_key)
+
+    if missing:
+        fetched = []
+        with ThreadPoolExecutor(max_workers=REVIEW_FETCH_WORKERS) as executor:
+            futures = {executor.submit(get_place_reviews, API_KEY, {'id': str(place_id), 'name': place['name'],
+                                                                    'place_id': place['place_id']}): place_id
+                       for place_id, (place, _) in missing.items()}
+            for future in as_completed(futures):
+                place_id = futures[future]
+                place, placeholder = missing[place_id]
+                refetched.add(place_id)
+                try:
+                    place_reviews, error = future.result(), None
+                except Exception as e:
+                    # Only this card shows the failure
+                    place_reviews, error = pd.DataFrame(), e
+                fetched.append(place_reviews)
+                with placeholder.container():
+                    place_card(place, place_reviews, f"{location}-{business_place}-{place_id}", error=error)
+
+        st.session_state[f'{location}-{business_place}-reviews'] = concat_frames([reviews_data] + fetched)
+
+    # Let the browser fetch the next page's photos in the background
+    next_places = place_data.iloc[start + LIST_PAGE_SIZE:start + 2 * LIST_PAGE_SIZE]
+    st.markdown(prefetch_links(page_photo_urls(next_places, reviews_for_places(reviews_data, next_places))),
+                unsafe_allow_html=True)
+
+    mark_reviews_loaded(city, country, business_place)
 
 
 def review_analytics_page(location, business_place):
@@ -138,16 +239,23 @@ def review_analytics_page(location, business_place):
     :return: Streamlit frame/view
     """
     place_data = st.session_state[f'{location}-{business_place}-data']
-    reviews_data = st.session_state[f'{location}-{business_place}-reviews']
+    exclude_duplicates = st.sidebar.toggle("Exclude near-duplicate reviews",
+                                           help="Leaves out reviews whose text is a near copy of an earlier review.")
+    reviews_data = session_reviews(location, business_place, exclude_duplicates)
+    if len(reviews_data) == 0:
+        st.info("No reviews found for this selection.")
+        return
 
     filter_kpi_row = st.columns((3, 1, 2, 2, 2, 2))
     place = filter_kpi_row[0].selectbox("Select place", options=reviews_data["place_Name"].unique())
 
     place_reviews = reviews_data[(reviews_data['place_Name'] == place)]
-    place_id = place_reviews['place_id'].iloc[0]
-    place_data = place_data[place_data['id']==int(place_id)]
+    place_id = int(place_reviews['place_id'].iloc[0])
+    place_data = place_data[place_data['id']==place_id]
 
-    total_reviews, average_ratings, unique_reviewers, monthly_reviews_rate = calculate_kpis(place_data, place_reviews)
+    review_cube = session_review_cube(location, business_place, exclude_duplicates)
+    total_reviews, average_ratings, unique_reviewers, monthly_reviews_rate = calculate_kpis(
+        place_data, review_cube.kpis(place_id))
 
     filter_kpi_row[2].metric(label="Average Rating", value=f"{average_ratings:.1f}")
     filter_kpi_row[3].metric(label="Total Reviews", value=f"{total_reviews}")
@@ -156,27 +264,30 @@ def review_analytics_page(location, business_place):
 
     charts_row_1 = st.columns((4, 3))
     # Reviews Distribution w.r.t Quarter-Year
-    charts_row_1[0].plotly_chart(average_rating_overtime(place_reviews), use_container_width=True)
+    charts_row_1[0].plotly_chart(chart_figure(average_rating_overtime, review_cube.quarterly(place_id)), use_container_width=True)
     # Rating distribution pie
-    charts_row_1[1].plotly_chart(rating_breakdown_pie(place_reviews), use_container_width=True)
+    charts_row_1[1].plotly_chart(chart_figure(rating_breakdown_pie, review_cube.rating_histogram(place_id)), use_container_width=True)
 
 
     charts_row_2 = st.columns((3, 4))
     # sentiment score over the time
-    charts_row_2[0].plotly_chart(sentiment_score_overtime(place_reviews), use_container_width=True)
+    charts_row_2[0].plotly_chart(chart_figure(sentiment_score_overtime, place_reviews, columns=SENTIMENT_COLUMNS), use_container_width=True)
     # rating over the time
-    charts_row_2[1].plotly_chart(average_rating_wrt_month_year(place_reviews), use_container_width=True)
+    charts_row_2[1].plotly_chart(chart_figure(average_rating_wrt_month_year, review_cube.monthly(place_id)), use_container_width=True)
     # Wordcloud of review text
-    st.pyplot(reviews_wordcloud(place_reviews), clear_figure=True, use_container_width=True)
+    st.image(reviews_wordcloud(*review_cube.term_frequencies(place_id)), use_column_width=True)
 
 
-@st.cache_resource
-def market_analysis_page(location, business_place):
+def market_analysis_page(business_place, country, city):
     """
     Function to create view for the 'Market Analysis' tab
     :return: Analytics charts
     """
-    place_data = st.session_state[f'{location}-{business_place}-data']
+    # Every market chart only uses the map payload columns
+    place_data = session_places(business_place, country, city, columns=PLACE_FIELDS)
+    if place_data is None or len(place_data) == 0:
+        st.info("No places found for this selection.")
+        return
 
     cols = st.columns(2)
     with cols[0]:
@@ -186,7 +297,35 @@ def market_analysis_page(location, business_place):
         st.write("#### Geographical Clusters of Business Points")
         spatial_dist_of_business_points(place_data)
 
-    st.plotly_chart(top_performing_places(place_data), use_container_width=True)
+    stored_data = get_stored_data()
+    scopes = {
+        f"{business_place} in {city}": [(business_place, country, city)],
+        f"All cities of {country}": [(business_place, country, market_city)
+                                     for market_city in stored_data.cities(business_place, country)],
+        f"All businesses in {city}": [(market_business, country, city) for market_business in stored_data.businesses()
+                                      if city in stored_data.cities(market_business, country)],
+    }
+    scope = st.radio("Rank places of", options=list(scopes), horizontal=True)
+    markets = scopes[scope]
+    if len(markets) == 1:
+        markets_places = [place_data]
+    else:
+        markets_places = [session_places(*market, columns=PLACE_FIELDS) for market in markets]
+    st.plotly_chart(chart_figure(top_performing_places, market_ranking(markets, markets_places)), use_container_width=True)
+
+
+def market_ranking(markets, markets_places):
+    """
+    Ranks the places of several markets together.
+
+    :param markets: (business place, country, city) of every market
+    :param markets_places: listings DataFrame of every market
+    :return: rank_places DataFrame; places are labelled with the city (or business) telling their markets apart
+    """
+    label_index = 2 if len({city for _, _, city in markets}) > 1 else 0
+    scores = [cached_market_scores(places, frame_fingerprint(places, RANKING_COLUMNS), market[label_index])
+              for market, places in zip(markets, markets_places) if places is not None and len(places) != 0]
+    return rank_places(scores)
 
 
 